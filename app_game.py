@@ -1,6 +1,9 @@
 import PySimpleGUI as sg
-from computer_player import ComputerPlayer
-from game_tree import GameTree
+from computer_player import ComputerPlayer, SearchCancelled
+from game_tree import BuildCancelled, GameTree
+from tablebase import Tablebase, default_tablebase_path
+import os
+import threading
 import time
 
 str_blue = "\033[34m"
@@ -11,10 +14,16 @@ str_reset = "\033[0m"
 
 default_depth_limit = 5
 
+
+class GameRestarted(Exception):
+    """Raised when the player clicks Restart in the game window, after any background work has stopped."""
+
+
 class GameGUI:
     player1_type : str
     player2_type : str
     intial_sequence_len : int
+    move_time_limit : float
     _button_keys : list
     _default_btn_clr : str
     _highlight_btn_clr : str
@@ -22,9 +31,17 @@ class GameGUI:
                         'Human': 'human',
                         'PC (Minimax)': 'minimax',
                         'PC (Alpha-Beta)': 'alpha_beta',
+                        'PC (PVS)': 'pvs',
+                        'PC (MTD(f))': 'mtdf',
+                        'PC (Layers)': 'backward_induction',
                         'PC (Greedy)': 'heuristic'
                     }
     _default_sequence_length : int = 10
+    _default_move_time_limit : float = 0
+    _task_done_key = '-TASK-DONE-'
+    """Event the background worker posts its result with."""
+    _status_interval_ms = 100
+    """How often the status line shows the progress of background work."""
     
     def __init__(self):
         sg.theme('DarkGrey11')
@@ -40,6 +57,7 @@ class GameGUI:
             [sg.Text("Player 2:"), sg.Push(), sg.Combo(list(self._player_types.keys()), default_value='PC (Minimax)', key='P2', size=(18, 1))],
             [sg.Column([[]], size=(1, 1), pad=(2, 2))],
             [sg.Text("Length of sequence (1-25):"), sg.Push(), sg.InputText(default_text=f'{self._default_sequence_length}', key='SEQ', size=(5, 1))],
+            [sg.Text("Seconds per PC move (0 = no limit):"), sg.Push(), sg.InputText(default_text=f'{self._default_move_time_limit}', key='TIME', size=(5, 1))],
             [sg.Text('', pad=(0, (1, 1)))],
             [sg.Push(), sg.Button("Start", size=(10,1)), sg.Push()]
         ]
@@ -54,21 +72,27 @@ class GameGUI:
             if event == "Start":
                 try:
                     seq_length = int(values['SEQ'])
-                    if 1 <= seq_length <= 25:
+                    move_time_limit = float(values['TIME'])
+                    if move_time_limit < 0:
+                        sg.popup_error("Time limit can not be negative!")
+                        window['TIME'].update(f'{self._default_move_time_limit}')
+                    elif 1 <= seq_length <= 25:
                         break
                     else:
                         sg.popup_error("Length must be between 1 and 25!")
-                        window['SEQ'].update(f'{self.default_sequence_length}')
+                        window['SEQ'].update(f'{self._default_sequence_length}')
                         
                 except ValueError:
-                    sg.popup_error("Please enter a valid number for sequence length.")
-                    window['SEQ'].update(f'{self.default_sequence_length}')
+                    sg.popup_error("Please enter a valid number for sequence length and time limit.")
+                    window['SEQ'].update(f'{self._default_sequence_length}')
+                    window['TIME'].update(f'{self._default_move_time_limit}')
 
         window.close()
         
         self.player1_type = self._player_types.get(values['P1'], None)
         self.player2_type = self._player_types.get(values['P2'], None)
         self.intial_sequence_len = int(values['SEQ'])
+        self.move_time_limit = float(values['TIME']) or None
 
     def open_game_dialog(self, game_sequence):
         self._button_keys = [f"BTN_{i}" for i in range(self.intial_sequence_len)]
@@ -76,9 +100,61 @@ class GameGUI:
                 [sg.Text("Player 1:", pad=(0, 0)), sg.Text('0', key='text_score_p1', size=(3, 1), justification='left', pad=(0, 0)),
                 sg.Push(), sg.Text("Click two adjacent buttons to remove them"),sg.Push(),
                 sg.Text("Player 2:", pad=(0, 0)), sg.Text('0', key='text_score_p2', size=(3, 1), justification='left', pad=(0, 0))],
-                [sg.Push(), *[sg.Button(char, key=key, size=(2, 1), pad=(0, 0), font=("Helvetica", 10)) for char, key in zip(game_sequence, self._button_keys)], sg.Push()]
+                [sg.Push(), *[sg.Button(char, key=key, size=(2, 1), pad=(0, 0), font=("Helvetica", 10)) for char, key in zip(game_sequence, self._button_keys)], sg.Push()],
+                [sg.Text('', key='text_status', size=(55, 1)), sg.Push(), sg.Button("Restart", size=(8, 1))]
             ]
-        self._play_game_window = sg.Window("Match buttons", layout, size=(550, 100), finalize=True)
+        self._play_game_window = sg.Window("Match buttons", layout, size=(550, 130), finalize=True)
+
+    def _handle_game_window_event(self, event, cancel_event: threading.Event = None, thread: threading.Thread = None):
+        """
+        Handles closing the game window and Restart. Background work is cancelled first; on Restart it is awaited,
+        so the tree and the players are never used by two threads. Raises GameRestarted on Restart.
+        """
+        if event in (sg.WINDOW_CLOSED, None):
+            if cancel_event is not None:
+                cancel_event.set()
+            self._play_game_window.close()
+            exit()
+        if event == "Restart":
+            if cancel_event is not None:
+                cancel_event.set()
+                thread.join()
+            self._play_game_window.close()
+            raise GameRestarted()
+
+    def run_in_background(self, task, get_status):
+        """
+        Runs task(cancel_event) in a worker thread while the game window keeps handling events, and returns its result.
+        The result, or the exception the task raised, comes back through the window's event queue.
+        Meanwhile the status line shows get_status(elapsed seconds), and clicks on the sequence are ignored.
+        Closing the window or clicking Restart sets the cancel event, which stops tree builds and searches.
+        """
+        cancel_event = threading.Event()
+
+        def run():
+            try:
+                result = (task(cancel_event), None)
+            except (BuildCancelled, SearchCancelled):
+                return
+            except Exception as error:
+                result = (None, error)
+            self._play_game_window.write_event_value(self._task_done_key, result)
+
+        thread = threading.Thread(target=run, daemon=True)
+        start_time = time.time()
+        thread.start()
+        while True:
+            event, values = self._play_game_window.read(timeout=self._status_interval_ms)
+            if event == self._task_done_key:
+                self.update_status('')
+                result, error = values[event]
+                if error is not None:
+                    raise error
+                return result
+            if event == sg.TIMEOUT_EVENT:
+                self.update_status(get_status(time.time() - start_time))
+            else:
+                self._handle_game_window_event(event, cancel_event, thread)
 
     def game_finished(self, str_player_won):
         layout = [
@@ -98,23 +174,32 @@ class GameGUI:
                 window.close()
                 break
 
-    def get_user_move(self):
+    def get_user_move(self, ponder=None):
         """
         Wait for the user to click two adjacent buttons.
         Returns the index (extracted from the button key) of the left-most button in the selected pair.
         This version assumes that the current sequence is fully represented by the buttons,
         and that update_sequence() rebuilds the button row if the sequence changes.
+        Meanwhile ponder(cancel_event), if given, runs in a worker thread. It is cancelled and awaited before
+        the move is returned or the game window is left.
         """
+        cancel_event = threading.Event()
+        thread = None
+        if ponder is not None:
+            thread = threading.Thread(target=ponder, args=(cancel_event,), daemon=True)
+            thread.start()
+        try:
+            return self._wait_for_user_move()
+        finally:
+            cancel_event.set()
+            if thread is not None:
+                thread.join()
+
+    def _wait_for_user_move(self):
         selected_index = None
         while True:
             event, _ = self._play_game_window.read()
-            
-            if event in (sg.WINDOW_CLOSED, None):
-                self._play_game_window.close()
-                exit()  # or raise an exception / return None depending on how you want to handle it
-            
-            if event is None:
-                continue
+            self._handle_game_window_event(event)
             # Only process events coming from buttons with keys starting with "BTN_"
             if event.startswith("BTN_"):
                 current_index = int(event.split("_")[1])
@@ -145,6 +230,9 @@ class GameGUI:
             else:
                 self._play_game_window[key].update(visible=False)
 
+    def update_status(self, status: str):
+        self._play_game_window['text_status'].update(status)
+
     def update_score(self, score_player1, score_player2):
         """
         Update the score texts on the GUI.
@@ -152,32 +240,61 @@ class GameGUI:
         self._play_game_window['text_score_p1'].update(score_player1)
         self._play_game_window['text_score_p2'].update(score_player2)
 
-gui = GameGUI()
+def get_computer_player(player: int, player_type: str) -> ComputerPlayer:
+    """Returns the computer player for the settings, computer players are kept between games."""
+    key = (player, player_type, gui.move_time_limit)
+    if key not in computer_players:
+        computer_players[key] = ComputerPlayer(player_type, tablebase=tablebase, time_limit=gui.move_time_limit)
+    pc_player = computer_players[key]
+    pc_player.reset_counter()
+    return pc_player
 
-while True:
-    print(f"{str_blue}Starting game: {gui.player1_type} vs {gui.player2_type}, Sequence Length: {gui.intial_sequence_len}{str_reset}")
+
+def search_in_background(pc_player: ComputerPlayer, state, is_player1: bool, player_label: str):
+    """Searches 'state' in the background, the status line shows the nodes visited and the completed depth."""
+    def search(cancel_event):
+        pc_player.cancel_event = cancel_event
+        return pc_player.get_path(state, is_player1)
+
+    def get_status(elapsed):
+        stats = pc_player.stats
+        return (f"{player_label} ({pc_player.algorithm}) thinking {elapsed:.1f} s: "
+                f"{stats.nodes:,} nodes, depth {stats.completed_depth}")
+
+    return gui.run_in_background(search, get_status)
+
+
+def move_in_background(game_tree: GameTree, move):
+    """Makes a move in the background, it builds the next layers of the tree."""
+    def make_move(cancel_event):
+        game_tree.cancel_event = cancel_event
+        move()
+
+    gui.run_in_background(make_move, lambda elapsed: f"Extending game tree {elapsed:.1f} s...")
+
+
+def play_game() -> str:
+    """Plays one game in the open game window and returns the result text."""
+    sequence = GameTree._generate_random_sequence(gui.intial_sequence_len)
+    gui.open_game_dialog(sequence)
 
     print(f"{str_blue}Generating game tree... ", end="")
     timer = time.time()
-    game_tree = GameTree(gui.intial_sequence_len, default_depth_limit)
+    game_tree = gui.run_in_background(
+        lambda cancel_event: GameTree(sequence, default_depth_limit, tablebase_length=tablebase_length,
+                                      cancel_event=cancel_event),
+        lambda elapsed: f"Building game tree {elapsed:.1f} s...")
     timer = time.time() - timer
     print(f"done in {timer:.6f} seconds, starting sequence {game_tree.initial_sequence}, depth limit {game_tree.depth_limit}\n{str_reset}")
-    gui.open_game_dialog(game_tree.initial_sequence)
 
     game_start_time = time.time()
 
     predicted_score = None
-    if gui.player1_type != 'human':
-        pc_player1 = ComputerPlayer(gui.player1_type)
-        path, predicted_score = pc_player1.get_path(game_tree.current_state, True)
-    else:
-        pc_player1 = None
-        
-    if gui.player2_type != 'human':
-        pc_player2 = ComputerPlayer(gui.player2_type)
-        path, predicted_score = pc_player2.get_path(game_tree.current_state, True)
-    else:
-        pc_player2 = None
+    pc_player1 = get_computer_player(1, gui.player1_type) if gui.player1_type != 'human' else None
+    pc_player2 = get_computer_player(2, gui.player2_type) if gui.player2_type != 'human' else None
+    for pc_player, player_label in ((pc_player1, "Player 1"), (pc_player2, "Player 2")):
+        if pc_player is not None:
+            path, predicted_score = search_in_background(pc_player, game_tree.current_state, True, player_label)
 
     print(f"{str_blue}Game started. {str_reset}", end="")
     if predicted_score != None:
@@ -203,15 +320,21 @@ while True:
         print(f"{color}Move #{game_tree.current_depth} - {game_tree.current_state} {player_label} move:", end="")
 
         if player_type == 'human':
-            first_digit_to_join = gui.get_user_move()
-            game_tree.move_to_next_state_by_move(first_digit_to_join)
+            # The computer opponent searches its replies while the human thinks
+            opponent = pc_player2 if is_player1 else pc_player1
+            ponder = (lambda cancel_event: opponent.ponder(game_tree, cancel_event)) if opponent is not None else None
+            first_digit_to_join = gui.get_user_move(ponder)
+            move = lambda: game_tree.move_to_next_state_by_move(first_digit_to_join)
         else:
             move_start_time = time.time()
-            optimal_path, _ = pc_player.get_path(game_tree.current_state, is_player1)
+            optimal_path, _ = search_in_background(pc_player, game_tree.current_state, is_player1, player_label)
             move_end_time = time.time()
+            if pc_player.stats.pondered:
+                print(" (pondered)", end="")
             total_computer_move_time += (move_end_time - move_start_time)
             computer_move_count += 1
-            game_tree.move_to_next_state_by_child(optimal_path[1])
+            move = lambda: game_tree.move_to_next_state_by_child(optimal_path[1])
+        move_in_background(game_tree, move)
 
         print(f"{game_tree.current_state}{str_reset}")
         gui.update_sequence(game_tree.current_state.sequence)
@@ -231,15 +354,37 @@ while True:
     print(f"{str_blue}Game over. {str_player_won}{str_reset}")
     print(f"{str_blue}Game duration: {game_duration:.2f} seconds{str_reset}")
     if pc_player1 != None:
-        print(f"{str_blue}Game tree nodes visited by Player 1 ({pc_player1.algorithm}): {pc_player1.nodes_visited}{str_reset}")
+        print(f"{str_blue}Game tree nodes visited by Player 1 ({pc_player1.algorithm}): {pc_player1.nodes_visited}, "
+              f"pondering: {pc_player1.ponder_nodes}{str_reset}")
+        pc_player1.transposition_table.print_stats()
     if pc_player2 != None:
-        print(f"{str_blue}Game tree nodes visited by Player 2 ({pc_player2.algorithm}): {pc_player2.nodes_visited}{str_reset}")
+        print(f"{str_blue}Game tree nodes visited by Player 2 ({pc_player2.algorithm}): {pc_player2.nodes_visited}, "
+              f"pondering: {pc_player2.ponder_nodes}{str_reset}")
+        pc_player2.transposition_table.print_stats()
 
     if computer_move_count > 0:
         average_computer_move_time = total_computer_move_time / computer_move_count
         print(f"{str_blue}Average time for computer moves: {average_computer_move_time:.2f} seconds{str_reset}")
     else:
         print(f"{str_blue}No computer moves were made in this game.{str_reset}")
-            
-    gui.game_finished(str_player_won)
+
+    return str_player_won
+
+
+gui = GameGUI()
+
+# Endgame tablebase, generated with 'python tablebase.py'
+tablebase = Tablebase(default_tablebase_path) if os.path.exists(default_tablebase_path) else None
+tablebase_length = tablebase.max_length if tablebase is not None else 0
+# Computer players are kept between games, so their transposition tables are reused
+computer_players = {}
+
+while True:
+    print(f"{str_blue}Starting game: {gui.player1_type} vs {gui.player2_type}, Sequence Length: {gui.intial_sequence_len}{str_reset}")
+    try:
+        str_player_won = play_game()
+    except GameRestarted:
+        print(f"{str_blue}Game restarted.{str_reset}")
+    else:
+        gui.game_finished(str_player_won)
     gui.set_settings_dialog()
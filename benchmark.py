@@ -0,0 +1,217 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from computer_player import ComputerPlayer
+from game_tree import GameTree
+
+try:
+    import numpy as np
+except ImportError:
+    # The vectorized builder is skipped without NumPy
+    np = None
+
+str_blue = "\033[34m"
+str_red = "\033[31m"
+str_green = "\033[32m"
+str_reset = "\033[0m"
+
+default_baseline_path = "benchmark_baseline.json"
+default_lengths = (5, 10, 15, 20, 25)
+default_algorithms = ("minimax", "alpha_beta", "pvs", "mtdf", "backward_induction", "heuristic")
+
+_lower_is_better = ("seconds", "peak_bytes", "nodes", "nodes_visited")
+"""Metrics compared with the baseline. Node counts are deterministic, so any growth beyond the threshold is real."""
+_min_seconds = 0.02
+"""Timings where both runs are below this are dominated by noise and not compared."""
+_environment_keys = ("python", "numpy", "cpu_count")
+"""Results that differ in any of these were measured elsewhere, only their deterministic metrics are compared."""
+
+
+def get_sequences(lengths=default_lengths, seed: int = 20) -> dict:
+    """
+    Returns a fixed sequence for every length. Each length has a generator of its own, seeded from 'seed' and the length,
+    so a sequence does not depend on which other lengths are benchmarked.
+    """
+    sequences = {}
+    for length in lengths:
+        rng = random.Random(seed * 100 + length)
+        sequences[length] = "".join(rng.choice("01") for _ in range(length))
+    return sequences
+
+
+def _build(sequence: str, depth_limit: int, builder: str, workers: int) -> GameTree:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return GameTree(sequence, depth_limit is None, depth_limit if depth_limit is not None else 5,
+                        vectorized=builder == "vectorized", workers=workers if builder == "sharded" else 1)
+
+
+def benchmark_build(sequence: str, depth_limit: int = None, builder: str = "loop", workers: int = 1,
+                    repeat: int = 3) -> dict:
+    """
+    Builds the tree of 'sequence' 'repeat' times with the given builder ("loop", "vectorized" or "sharded")
+    and once more under tracemalloc for the peak memory. Without a depth limit the game's own depth is used.
+    Returns the best time, the peak memory, the node count and nodes built per second.
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        game = _build(sequence, depth_limit, builder, workers)
+        seconds = min(seconds, time.perf_counter() - start_time)
+        game.close()
+    tracemalloc.start()
+    game = _build(sequence, depth_limit, builder, workers)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    game.close()
+    nodes = len(game.pool)
+    return {"depth_limit": game.depth_limit, "seconds": seconds, "peak_bytes": peak_bytes, "nodes": nodes,
+            "nodes_per_second": nodes / seconds if seconds else 0.0}
+
+
+def benchmark_search(game: GameTree, algorithm: str, workers: int = 1, repeat: int = 3) -> dict:
+    """
+    Searches the current state of 'game' 'repeat' times, each time with a new player so no table entries are reused.
+    Worker processes are started before the clock starts. Returns the best time, the nodes visited and the score.
+    """
+    seconds = float("inf")
+    is_maximizing = game.get_current_player() == 1
+    for _ in range(repeat):
+        player = ComputerPlayer(algorithm, workers=workers)
+        if workers > 1:
+            with contextlib.redirect_stdout(io.StringIO()):
+                player.get_path(GameTree("0110", False, 2).root, True)
+            player.reset_counter()
+        start_time = time.perf_counter()
+        _, score = player.get_path(game.current_state, is_maximizing)
+        seconds = min(seconds, time.perf_counter() - start_time)
+        player.close()
+    return {"seconds": seconds, "nodes_visited": player.nodes_visited, "score": score}
+
+
+def run_benchmarks(lengths=default_lengths, seed: int = 20, depth_limit: int = None,
+                   algorithms=default_algorithms, workers=(1,), repeat: int = 3) -> dict:
+    """
+    Runs the build and search benchmarks for one fixed sequence per length.
+    Cases are named "build/<builder>/<length>" and "search/<algorithm>/<length>", with "/w<workers>" appended
+    for parallel runs. Returns the results with the environment they were measured in.
+    """
+    cases = {}
+    builders = ["loop"] + (["vectorized"] if np is not None else [])
+    for length, sequence in get_sequences(lengths, seed).items():
+        length_cases = {}
+        for builder in builders:
+            length_cases[f"build/{builder}/{length}"] = benchmark_build(sequence, depth_limit, builder, 1, repeat)
+        for count in workers:
+            if count > 1:
+                length_cases[f"build/sharded/{length}/w{count}"] = benchmark_build(sequence, depth_limit, "sharded",
+                                                                                  count, repeat)
+        game = _build(sequence, depth_limit, "loop", 1)
+        for algorithm in algorithms:
+            for count in workers:
+                if count > 1 and algorithm == "heuristic":
+                    continue
+                name = f"search/{algorithm}/{length}" + (f"/w{count}" if count > 1 else "")
+                length_cases[name] = benchmark_search(game, algorithm, count, repeat)
+        for case in length_cases.values():
+            case["sequence"] = sequence
+        cases.update(length_cases)
+    return {"seed": seed, "repeat": repeat, "python": platform.python_version(),
+            "numpy": np.__version__ if np is not None else None, "cpu_count": os.cpu_count(), "cases": cases}
+
+
+def compare_results(results: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """
+    Compares every metric of 'results' that is lower when better with the same case of 'baseline'.
+    Returns a list of (case, metric, baseline value, new value) for all metrics more than 'threshold' worse.
+    Cases missing from either side or measured on another sequence are skipped, and so are the timings of a
+    baseline from another environment (see is_same_environment).
+    """
+    compare_seconds = is_same_environment(results, baseline)
+    regressions = []
+    for name, case in results["cases"].items():
+        baseline_case = baseline.get("cases", {}).get(name)
+        if baseline_case is None or baseline_case.get("sequence") != case.get("sequence"):
+            continue
+        for metric in _lower_is_better:
+            if metric not in case or metric not in baseline_case:
+                continue
+            old, new = baseline_case[metric], case[metric]
+            if metric == "seconds" and (not compare_seconds or max(old, new) < _min_seconds):
+                continue
+            if new > old * (1 + threshold):
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def is_same_environment(results: dict, baseline: dict) -> bool:
+    """True if both results were measured with the same Python, NumPy and CPU count, so their timings compare."""
+    return all(results.get(key) == baseline.get(key) for key in _environment_keys)
+
+
+def print_results(results: dict, baseline: dict = None):
+    """Prints one line per case, with the change against the baseline when one is given."""
+    baseline_cases = baseline.get("cases", {}) if baseline is not None else {}
+    for name, case in results["cases"].items():
+        line = f"{name:<32} {1000 * case['seconds']:10.2f} ms"
+        if "nodes" in case:
+            line += f" {case['nodes']:>10,} nodes {case['nodes_per_second']:>12,.0f} nodes/s {case['peak_bytes']:>12,} B peak"
+        else:
+            line += f" {case['nodes_visited']:>10,} visited   score {case['score']}"
+        old = baseline_cases.get(name)
+        if old is not None and old.get("sequence") == case.get("sequence") and old["seconds"]:
+            line += f"  ({case['seconds'] / old['seconds']:.2f}x baseline time)"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tree building and search on fixed seeded sequences.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=list(default_lengths),
+                        help="sequence lengths to benchmark (default: 5 10 15 20 25)")
+    parser.add_argument("--seed", type=int, default=20, help="seed of the sequences (default: 20)")
+    parser.add_argument("--depth-limit", type=int, default=None,
+                        help="plies to build (default: the depth the game uses for the length)")
+    parser.add_argument("--algorithms", nargs="+", default=list(default_algorithms), help="algorithms to search with")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1],
+                        help="worker counts for the sharded build and the parallel search (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is kept (default: 3)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=default_baseline_path,
+                        help=f"results to compare with (default: {default_baseline_path}, measured with the default "
+                             "settings)")
+    parser.add_argument("--no-baseline", action="store_true",
+                        help="do not compare, e.g. to measure a new baseline with --output")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown or growth counted as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.no_baseline:
+        if not os.path.exists(args.baseline):
+            parser.error(f"Baseline {args.baseline} not found. Measure one with "
+                         f"'python benchmark.py --no-baseline --output {args.baseline}' or pass --no-baseline.")
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    results = run_benchmarks(args.lengths, args.seed, args.depth_limit, args.algorithms, args.workers, args.repeat)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"{str_blue}Results written to {args.output}{str_reset}")
+    if baseline is not None:
+        regressions = compare_results(results, baseline, args.threshold)
+        for name, metric, old, new in regressions:
+            print(f"{str_red}Regression in {name}: {metric} {old:.6g} -> {new:.6g}{str_reset}")
+        if not is_same_environment(results, baseline):
+            print(f"{str_blue}{args.baseline} was measured in another environment, timings were not "
+                  f"compared{str_reset}")
+        if regressions:
+            sys.exit(1)
+        print(f"{str_green}No regressions against {args.baseline} (threshold {args.threshold:.0%}){str_reset}")
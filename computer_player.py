@@ -1,56 +1,275 @@
-from game_tree import GameTree
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import contextlib
+import cProfile
+import io
+
+from game_tree import BuildCancelled, GameState, GameTree, NodePool
+from search_stats import SearchStats
+from tablebase import Tablebase
+from transposition_table import TranspositionTable, exact, lower_bound, upper_bound
 import time
 
+try:
+    import numpy as np
+except ImportError:
+    # Layers are evaluated node by node without NumPy
+    np = None
+
 str_blue = "\033[34m"
 str_red = "\033[31m"
 str_green = "\033[32m"
 str_yellow = "\033[33m"
 str_reset = "\033[0m"
 
+class _SearchTimeout(Exception):
+    """Raised inside an anytime search when the move deadline has passed."""
+
+
+class SearchCancelled(Exception):
+    """Raised by get_path when the player's cancel_event is set during the search."""
+
+
+_worker_players = {}
+"""Players of a worker process by their options, so their transposition tables are kept between tasks."""
+
+
+def _search_subtree(task: tuple) -> tuple:
+    """
+    Searches one root child in a worker process of a parallel search (see ComputerPlayer._parallel_root_search).
+    The task holds the child as a sequence with the search window and the player options, the worker builds the
+    subtree itself with the caller's canonicalization. Returns (value, moves, stats), where moves is the principal variation as pair indices
+    if the value is exact, otherwise None, and stats the SearchStats of the subtree.
+    """
+    sequence, is_maximizing, depth_left, alpha, beta, options = task
+    algorithm, canonicalize, tablebase_path, table_size, replacement, move_ordering, check_patterns = options
+    player = _worker_players.get(options)
+    if player is None:
+        player = ComputerPlayer(algorithm, canonicalize=canonicalize, tablebase=tablebase_path,
+                                table_size=table_size, replacement=replacement, move_ordering=move_ordering,
+                                check_patterns=check_patterns)
+        _worker_players[options] = player
+    tablebase_length = player.tablebase.max_length if player.tablebase is not None else 0
+    # Pruning searches only expand what they visit, full searches visit everything and build faster in layers
+    lazy = algorithm not in ("minimax", "backward_induction")
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = GameTree(sequence, False, depth_left, canonicalize=canonicalize, tablebase_length=tablebase_length,
+                        lazy=lazy, vectorized=np is not None and not lazy, first_player=1 if is_maximizing else 2)
+    player._start_stats(game.root)
+    value, path = player._search_window(game.root, is_maximizing, alpha, beta, depth_left)
+    player._finish_stats()
+    moves = ComputerPlayer._get_path_moves(path) if path is not None else None
+    return value, moves, player.stats
+
+
 class ComputerPlayer:
-    def __init__(self, algorithm: str = "minimax"):
+    _pattern_3_scale = 0.001
+    """Weight of the sequence patterns in the heuristic score."""
+    _value_scale = 1000
+    """Search values are integers, score difference * _value_scale plus the pattern score, so they compare exactly."""
+    move_orderings = ("table", "killer", "heuristic", "history")
+    """Move ordering sources of alpha-beta, in order of priority."""
+    _cancel_poll_seconds = 0.1
+    """How often a parallel search waiting for its workers checks the cancel event."""
+
+    def __init__(self, algorithm: str = "minimax", canonicalize: bool = True, tablebase=None,
+                 time_limit: float = None, table_size: int = 1_000_000, replacement: str = "lru",
+                 move_ordering: tuple = ("table", "heuristic"), check_patterns: bool = False, workers: int = 1,
+                 profile: bool = False, cancel_event=None):
         """
         Initialize the computer player with the chosen algorithm.
         
         Supported algorithms:
             - "minimax": Uses the minimax algorithm.
             - "alpha_beta": Uses minimax with alpha-beta pruning.
+            - "pvs": Principal variation search, null-window searches of all but the first move.
+            - "mtdf": MTD(f), converges on the value with null-window alpha-beta searches only.
+            - "backward_induction": Minimax values of the whole tree computed layer by layer from the leaves up,
+              each unique node once, without recursion or transposition table lookups.
             - "heuristic": Uses a greedy heuristic path selection.
         
         :param algorithm: A string indicating the algorithm to use.
+        :param canonicalize: Share cache entries between a sequence and its complement.
+        :param tablebase: A Tablebase or a path to a tablebase file. Positions short enough to be stored in it
+                          are answered exactly from the tablebase instead of being searched.
+        :param time_limit: Seconds per move. When set, all algorithms except heuristic search one ply deeper at a time
+                           with alpha-beta and return the best move of the deepest search finished before the deadline.
+        :param table_size: Maximum number of entries in the transposition table, which is kept across moves and games.
+        :param replacement: Transposition table replacement policy, "lru" or "depth" (keep the deeper search).
+        :param move_ordering: Which moves alpha-beta searches first, any of "table" (best move of an earlier search),
+                              "killer" (moves that caused cutoffs at the same sequence length), "heuristic"
+                              (one-ply score estimate) and "history" (cutoffs per pair index and pair type).
+                              An empty tuple searches the moves in generation order. Killer and history ordering
+                              are off by default, after the score change ordering they cost more nodes than they save.
+        :param check_patterns: Check mode, recounts the patterns of every evaluated state from its sequence
+                               and asserts they equal the incrementally maintained counts.
+        :param workers: Number of processes searching the children of the current state in parallel.
+                        With 1 the search runs in the calling process. Not used with time_limit or by heuristic.
+        :param profile: Run every search under cProfile, the profile is kept in stats.profile.
+        :param cancel_event: A threading.Event another thread sets to stop the search, get_path then raises
+                             SearchCancelled. The transposition table keeps only results of completed subtrees,
+                             so the player can search again once the event is cleared or replaced.
         :raises ValueError: If the provided algorithm is not supported.
         """
-        valid_algorithms = {"minimax", "alpha_beta", "heuristic"}
+        valid_algorithms = {"minimax", "alpha_beta", "pvs", "mtdf", "backward_induction", "heuristic"}
         if algorithm not in valid_algorithms:
-            raise ValueError("Unsupported algorithm. Choose minimax, alpha_beta, or heuristic.")
+            raise ValueError("Unsupported algorithm. Choose minimax, alpha_beta, pvs, mtdf, backward_induction, "
+                             "or heuristic.")
+        if not set(move_ordering) <= set(self.move_orderings):
+            raise ValueError("Unsupported move ordering. Choose from table, killer, heuristic and history.")
+        if workers < 1:
+            raise ValueError("Number of workers must be positive.")
         self.algorithm = algorithm
+        self.canonicalize = canonicalize
+        if tablebase is not None and not isinstance(tablebase, Tablebase):
+            tablebase = Tablebase(tablebase)
+        self.tablebase = tablebase
+        self.time_limit = time_limit
+        self.transposition_table = TranspositionTable(table_size, replacement)
+        self.move_ordering = tuple(move_ordering)
+        self.check_patterns = check_patterns
+        self.workers = workers
+        self.profile = profile
+        self.cancel_event = cancel_event
+        self.stats = SearchStats(algorithm)
+        self.hooks = []
+        self._executor = None
+        self._root_length = 0
+        self._table_counters = (0, 0, 0)
+        self._killer_moves = {}
+        self._history = {}
+        self.completed_depth = 0
+        self.mtdf_passes = 0
         self.nodes_visited = 0
-        optimal_path = None
+        self.ponder_nodes = 0
+        self._pondered = {}
+        self._mtdf_guess = None
+        self._search_deadline = None
+        self.optimal_path = None
 
     def reset_counter(self):
-        """Reset the nodes visited counter to zero."""
+        """Reset the nodes visited counters to zero."""
         self.nodes_visited = 0
+        self.ponder_nodes = 0
+
+    def add_hook(self, callback):
+        """
+        Registers callback(event, stats), called with the player's SearchStats on the events
+        "start" (before a search), "iteration" (an anytime search completed a depth) and "end" (statistics complete).
+        """
+        self.hooks.append(callback)
 
     def get_path(self, state_node, is_maximizing: bool = True):
         """
         Compute the path for the current state using the chosen algorithm.
-        This method also counts the visited nodes during the algorithm's execution.
+        This method also counts the visited nodes during the algorithm's execution
+        and collects the statistics of the search in self.stats.
         It returns both the path and the final score.
         
         :param state_node: The current game state node.
         :param is_maximizing: Flag to indicate whether the current move is maximizing.
         :return: A tuple (path, score) where path is a list of states and score is the heuristic score.
         """
-        if self.algorithm == "minimax":
-            score, self.optimal_path = self._minimax_cached(state_node, is_maximizing, cache={})
-            return self.optimal_path, score
+        self._start_stats(state_node)
+        self._run_hooks("start")
+        profiler = cProfile.Profile() if self.profile else None
+        with self.stats.timer("total"):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                path, score = self._search(state_node, is_maximizing)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        self.stats.profile = profiler
+        self._finish_stats()
+        self._run_hooks("end")
+        return path, score
+
+    def _search(self, state_node, is_maximizing: bool):
+        """Dispatches get_path to the chosen algorithm."""
+        if self.tablebase is not None:
+            value = self._probe_tablebase(state_node, is_maximizing)
+            if value is not None:
+                # Answered in O(1), nothing below the state needs to be searched
+                self._count_node(state_node)
+                self.optimal_path = self._extend_path_with_tablebase([state_node], is_maximizing)
+                return self.optimal_path, self._to_score(state_node, value)
+
+        self._killer_moves = {}
+        self._history = {}
+        pondered = self._pop_pondered(state_node, is_maximizing) if self._pondered else None
+        if pondered is not None:
+            value, moves = pondered
+            self.stats.pondered = True
+            score, self.optimal_path = self._to_score(state_node, value), self._follow_moves(state_node, moves)
+        elif self.time_limit is not None and self.algorithm != "heuristic":
+            score, self.optimal_path = self._iterative_deepening(state_node, is_maximizing)
+        elif self.workers > 1 and self.algorithm != "heuristic":
+            score, self.optimal_path = self._parallel_root_search(state_node, is_maximizing)
+        elif self.algorithm == "minimax":
+            score, self.optimal_path = self._minimax_cached(state_node, is_maximizing)
         elif self.algorithm == "alpha_beta":
-            score, self.optimal_path = self._alpha_beta_cached(state_node, is_maximizing, cache={})
-            return self.optimal_path, score
+            score, self.optimal_path = self._alpha_beta_cached(state_node, is_maximizing)
+        elif self.algorithm == "pvs":
+            score, self.optimal_path = self._pvs_cached(state_node, is_maximizing)
+        elif self.algorithm == "mtdf":
+            score, self.optimal_path = self._mtdf(state_node, is_maximizing)
+        elif self.algorithm == "backward_induction":
+            score, self.optimal_path = self._backward_induction(state_node, is_maximizing)
         elif self.algorithm == "heuristic":
             score, self.optimal_path = self._heuristic_path(state_node, is_maximizing)
-            return self.optimal_path, score
+        if self.tablebase is not None:
+            with self.stats.timer("tablebase"):
+                self.optimal_path = self._extend_path_with_tablebase(self.optimal_path, is_maximizing)
+        return self.optimal_path, score
+
+    def _start_stats(self, state_node):
+        """Starts new statistics for a search of 'state_node'."""
+        self.stats = SearchStats(self.algorithm, self._get_search_depth(state_node))
+        self._root_length = state_node.length
+        table = self.transposition_table
+        self._table_counters = (table.hits, table.misses, table.stores)
+
+    def _finish_stats(self):
+        """Completes the statistics with the transposition table counters of the search."""
+        table = self.transposition_table
+        hits, misses, stores = self._table_counters
+        self.stats.table_hits += table.hits - hits
+        self.stats.table_misses += table.misses - misses
+        self.stats.table_stores += table.stores - stores
+
+    def _run_hooks(self, event: str):
+        for callback in self.hooks:
+            callback(event, self.stats)
+
+    def _count_node(self, state_node):
+        """
+        Counts a visited node, at its ply below the searched state (every move shortens the sequence by one).
+        Every search counts its nodes here, so this is also where a cancelled search stops.
+        """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchCancelled()
+        self.nodes_visited += 1
+        ply = self._root_length - state_node.length
+        nodes_per_depth = self.stats.nodes_per_depth
+        if 0 <= ply < len(nodes_per_depth):
+            nodes_per_depth[ply] += 1
+        else:
+            # Searches called without get_path count from the length of the last searched state
+            self.stats.record_nodes(max(ply, 0))
         
+    def _check_cancelled(self):
+        """Stops the search with SearchCancelled if the cancel event is set, for loops that count no nodes."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SearchCancelled()
+
+    def close(self):
+        """Stops the worker processes of the parallel search, they are started again when needed."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
     def print_path(self):
         """Print the path of states."""
         for state in self.optimal_path:
@@ -64,8 +283,20 @@ class ComputerPlayer:
                 count += 1
         return count
 
-    def _get_heuristic_score(self, state):
-        pattern_3_scale = 0.001
+    def _get_pattern_score(self, state):
+        """
+        Sequence-only part of the heuristic: weighted counts of 3-digit patterns and the lone-pair penalty.
+        The counts are kept on the state and derived from the parent's counts when the child is created.
+        In check mode they are compared with a full recount.
+        """
+        self.stats.leaf_evaluations += 1
+        score = state.pattern_score
+        if self.check_patterns:
+            assert score == self._count_pattern_score(state), f"Pattern counts of {state} differ from a recount."
+        return score
+
+    def _count_pattern_score(self, state):
+        """Counts the pattern score of a state from its sequence string."""
         p001 = self._get_count_of_subsequence(state.sequence, "001")
         p010 = self._get_count_of_subsequence(state.sequence, "010")
         p011 = self._get_count_of_subsequence(state.sequence, "011")
@@ -78,107 +309,850 @@ class ComputerPlayer:
         
         p2 = -1 if (p11 + p00) == 1 else 0
         
+        return p001 - p010 + p011 + p100 - p101 + p110 + p2
+
+    def _get_heuristic_score(self, state):
         state_score = state.score_player1 - state.score_player2
         
-        heuristic_score = state_score + pattern_3_scale * (p001 - p010 + p011 + p100 - p101 + p110 + p2)
+        heuristic_score = state_score + self._pattern_3_scale * self._get_pattern_score(state)
         return heuristic_score
-    
-    def _minimax_cached(self, state_node, is_maximizing: bool, cache={}, depth=0):
-        state_hash = (state_node.sequence, state_node.score_player1, state_node.score_player2)
-        if state_hash in cache:
-            return cache[state_hash]
+
+    def evaluate_layer(self, pool: NodePool, nodes):
+        """
+        Evaluates many pool nodes at once, typically a whole leaf layer such as GameTree._last_build_layer.
+        Returns the absolute search value of every node, score difference * _value_scale plus the pattern score,
+        as a NumPy int64 array computed with a few vectorized operations on the pool columns, or as a list
+        when NumPy is not installed. In check mode every value is compared with a full recount.
+        """
+        self.stats.leaf_evaluations += len(nodes)
+        if np is not None:
+            nodes = np.asarray(nodes, dtype=np.intp)
+            score_player1 = np.frombuffer(pool.score_player1, dtype=np.int8)[nodes].astype(np.int64)
+            score_player2 = np.frombuffer(pool.score_player2, dtype=np.int8)[nodes]
+            pattern_weight = np.frombuffer(pool.pattern_weight, dtype=np.int8)[nodes]
+            equal_pairs = np.frombuffer(pool.equal_pairs, dtype=np.uint8)[nodes]
+            values = self._value_scale * (score_player1 - score_player2) + pattern_weight - (equal_pairs == 1)
+        else:
+            values = [self._value_scale * (pool.score_player1[node] - pool.score_player2[node])
+                      + pool.pattern_weight[node] - (pool.equal_pairs[node] == 1) for node in nodes]
+        if self.check_patterns:
+            for node, value in zip(nodes, values):
+                state = GameState._view(pool, int(node))
+                expected = (self._value_scale * (state.score_player1 - state.score_player2)
+                            + self._count_pattern_score(state))
+                assert value == expected, f"Batch value of {state} differs from a recount."
+        return values
+
+    def _to_score(self, state_node, value):
+        """
+        Converts a search value relative to 'state_node' back to a heuristic score.
+        The score is computed exactly like _get_heuristic_score computes it at the leaf.
+        """
+        total = self._value_scale * (state_node.score_player1 - state_node.score_player2) + value
+        state_score = (total + self._value_scale // 2) // self._value_scale
+        return state_score + self._pattern_3_scale * (total - self._value_scale * state_score)
+
+    def _probe_tablebase(self, state_node, is_maximizing: bool):
+        """
+        Answers a state from the tablebase, if it is short enough to be stored there.
+        Returns the exact change of the score difference under perfect play as a search value, or None.
+        """
+        entry = self.tablebase.probe(state_node.bits, state_node.length)
+        if entry is None:
+            return None
+        value, _ = entry
+        return self._value_scale * (value if is_maximizing else -value)
+
+    def _extend_path_with_tablebase(self, path, is_maximizing: bool):
+        """
+        Continues a path that ends in a tablebase position with the tablebase moves until the game ends.
+        Tree nodes are used while the tree has them, detached states below it.
+        'is_maximizing' refers to the first state of the path.
+        """
+        state = path[-1]
+        if self.tablebase.probe(state.bits, state.length) is None:
+            return path
+        path = list(path)
+        is_maximizing = is_maximizing if len(path) % 2 == 1 else not is_maximizing
+        bits, length = state.bits, state.length
+        score_p1, score_p2 = state.score_player1, state.score_player2
+        pool = None
+        while length > 1:
+            _, move = self.tablebase.probe(bits, length)
+            bits, score_change = GameTree._merge_pair(bits, length, move)
+            length -= 1
+            if is_maximizing:
+                score_p1 += score_change
+            else:
+                score_p2 += score_change
+            child = GameTree._find_child(path[-1], move)
+            if child is None:
+                pool = pool if pool is not None else NodePool()
+                child = GameState.from_bits(bits, length, score_p1, score_p2, pool=pool)
+            path.append(child)
+            is_maximizing = not is_maximizing
+        return path
+
+    def _get_state_hash(self, state_node):
+        """
+        Cache key of a state: its sequence only. Cached values are relative to the state's score difference,
+        and within a game the player to move is fixed by the sequence length.
+        Complementary sequences share a key when canonicalizing, as merging complementary pairs
+        yields complementary digits with the same score change.
+        """
+        return state_node.canonical_key if self.canonicalize else state_node.key
+
+    def _get_entry_key(self, state_node, depth_left: int, is_maximizing: bool) -> int:
+        """
+        Transposition table key: the state's cache key, the plies searched below it and the player to move.
+        Keeping the depth and the player in the key lets entries stay valid across moves and games.
+        """
+        return ((self._get_state_hash(state_node) << 7 | depth_left) << 1) | is_maximizing
+
+    @staticmethod
+    def _get_search_depth(state_node) -> int:
+        """Plies from 'state_node' down to the leaves of its tree, all of which are on the same layer."""
+        depth = 0
+        children = state_node.children
+        while children:
+            depth += 1
+            children = children[0].children
+        return depth
+
+    def _get_principal_variation(self, state_node, is_maximizing: bool, depth_left: int, value: int,
+                                 minimax: bool = False) -> list:
+        """
+        Rebuilds the path of a finished search with the relative 'value' from the best moves in the transposition
+        table. Each move is checked to reach the value, see _get_principal_move. After a minimax search the moves
+        are checked with minimax, so the statistics only count what minimax does.
+        """
+        with self.stats.timer("path"):
+            return self._follow_principal_moves(state_node, is_maximizing, depth_left, value, minimax)
+
+    def _follow_principal_moves(self, state_node, is_maximizing: bool, depth_left: int, value: int,
+                                minimax: bool = False) -> list:
+        path = [state_node]
+        while True:
+            move = self._get_principal_move(state_node, is_maximizing, depth_left, value, minimax)
+            if move is None:
+                return path
+            child = GameTree._find_child(state_node, move)
+            value -= self._value_scale * (child.score_player1 - child.score_player2
+                                          - state_node.score_player1 + state_node.score_player2)
+            path.append(child)
+            state_node = child
+            depth_left -= 1
+            is_maximizing = not is_maximizing
+
+    def _get_principal_move(self, state_node, is_maximizing: bool, depth_left: int, value: int,
+                            minimax: bool = False):
+        """
+        Returns a move of a state with the search value 'value' that reaches the value, or None at a leaf.
+        The stored best move is tried first. A move is accepted when a null-window search proves that its child
+        is worth at least as much as needed for the player to move. Such searches are mostly answered by the
+        entries the finished search left behind, including bound entries whose best move is not the final one.
+        With 'minimax' the child's minimax value is compared instead, minimax reads every entry as exact.
+        """
+        children = state_node.children if depth_left else None
+        if not children:
+            return None
+        if self.tablebase is not None and self._probe_tablebase(state_node, is_maximizing) is not None:
+            return None
+        entry = self.transposition_table.peek(self._get_entry_key(state_node, depth_left, is_maximizing))
+        first_move = entry[1] if entry is not None else None
+        child_moves = GameTree._get_child_moves(state_node, children)
+        child_moves.sort(key=lambda child_move: child_move[0] != first_move)
+        difference = state_node.score_player1 - state_node.score_player2
+        for move, child in child_moves:
+            target = value - self._value_scale * (child.score_player1 - child.score_player2 - difference)
+            if minimax:
+                if self._minimax_relative(child, not is_maximizing, depth_left - 1) == target:
+                    return move
+            elif is_maximizing:
+                if self._alpha_beta_relative(child, False, target - 1, target, depth_left - 1) >= target:
+                    return move
+            elif self._alpha_beta_relative(child, True, target, target + 1, depth_left - 1) <= target:
+                return move
+        return None
+
+    def _minimax_cached(self, state_node, is_maximizing: bool, depth_left: int = None):
+        if depth_left is None:
+            depth_left = self._get_search_depth(state_node)
+        value = self._minimax_relative(state_node, is_maximizing, depth_left)
+        path = self._get_principal_variation(state_node, is_maximizing, depth_left, value, minimax=True)
+        return self._to_score(state_node, value), path
+
+    def _minimax_relative(self, state_node, is_maximizing: bool, depth_left: int):
+        """
+        Returns the best reachable change of the score difference plus the pattern score of the leaf,
+        in _value_scale units. The pair index of the best move is stored with the value in the transposition table.
+        """
+        table = self.transposition_table
+        entry_key = self._get_entry_key(state_node, depth_left, is_maximizing)
+        entry = table.get(entry_key)
+        if entry is not None:
+            return entry[0]
         
-        self.nodes_visited += 1
+        self._count_node(state_node)
+
+        if self.tablebase is not None:
+            value = self._probe_tablebase(state_node, is_maximizing)
+            if value is not None:
+                table.store(entry_key, depth_left, (value, None, exact))
+                return value
         
-        if not state_node.children:
-            score = self._get_heuristic_score(state_node)
-            cache[state_hash] = (score, [state_node])
-            return score, [state_node]
+        children = state_node.children
+        if not children:
+            value = self._get_pattern_score(state_node)
+            table.store(entry_key, depth_left, (value, None, exact))
+            return value
         
-        optimal_path = []
+        difference = state_node.score_player1 - state_node.score_player2
+        best_move = None
         
         if is_maximizing:
-            best_score = -float('inf')
-            for child in state_node.children:
-                score, path = self._minimax_cached(child, False, cache, depth=depth+1)
-                indent = '\t' * depth
-                if score > best_score:
-                    best_score = score
-                    optimal_path = [state_node] + path
+            best_value = -float('inf')
+            for move, child in GameTree._get_child_moves(state_node, children):
+                value = self._minimax_relative(child, False, depth_left - 1)
+                value += self._value_scale * (child.score_player1 - child.score_player2 - difference)
+                if value > best_value:
+                    best_value = value
+                    best_move = move
         else:
-            best_score = float('inf')
-            for child in state_node.children:
-                score, path = self._minimax_cached(child, True, cache, depth=depth+1)
-                indent = '\t' * depth
-                if score < best_score:
-                    best_score = score
-                    optimal_path = [state_node] + path
+            best_value = float('inf')
+            for move, child in GameTree._get_child_moves(state_node, children):
+                value = self._minimax_relative(child, True, depth_left - 1)
+                value += self._value_scale * (child.score_player1 - child.score_player2 - difference)
+                if value < best_value:
+                    best_value = value
+                    best_move = move
         
-        cache[state_hash] = (best_score, optimal_path)
-        return best_score, optimal_path
+        table.store(entry_key, depth_left, (best_value, best_move, exact))
+        return best_value
 
-    def _alpha_beta_cached(self, state_node, is_maximizing, alpha=-float('inf'), beta=float('inf'), cache={}):
-        state_hash = (state_node.sequence, state_node.score_player1, state_node.score_player2)
-        
-        if state_hash in cache:
-            return cache[state_hash]
-        
-        self.nodes_visited += 1
+    def _alpha_beta_cached(self, state_node, is_maximizing, alpha=-float('inf'), beta=float('inf'),
+                           depth_left: int = None):
+        if depth_left is None:
+            depth_left = self._get_search_depth(state_node)
+        difference = self._value_scale * (state_node.score_player1 - state_node.score_player2)
+        value = self._alpha_beta_relative(state_node, is_maximizing, self._value_scale * alpha - difference,
+                                          self._value_scale * beta - difference, depth_left)
+        path = self._get_principal_variation(state_node, is_maximizing, depth_left, value)
+        return self._to_score(state_node, value), path
 
-        if not state_node.children:
-            score = self._get_heuristic_score(state_node)
-            result = (score, [state_node])
-            cache[state_hash] = result
-            return result
+    def _alpha_beta_relative(self, state_node, is_maximizing, alpha, beta, depth_left: int):
+        """Like _minimax_relative, with the (alpha, beta) window relative to the state's score difference."""
+        table = self.transposition_table
+        entry_key = self._get_entry_key(state_node, depth_left, is_maximizing)
+        entry = table.get(entry_key)
+        if entry is not None:
+            alpha, beta = self._apply_entry(entry, alpha, beta)
+            if alpha >= beta:
+                return entry[0]
+        first_move = entry[1] if entry is not None else None
         
-        # If children haven't been generated yet.
-        if state_node.children is None:
-            state_node.children = GameTree.generate_children(state_node)
+        self._count_node(state_node)
+
+        if self.tablebase is not None:
+            value = self._probe_tablebase(state_node, is_maximizing)
+            if value is not None:
+                table.store(entry_key, depth_left, (value, None, exact))
+                return value
+
+        children = state_node.children
+        if not children:
+            value = self._get_pattern_score(state_node)
+            table.store(entry_key, depth_left, (value, None, exact))
+            return value
         
-        optimal_path = []
+        difference = state_node.score_player1 - state_node.score_player2
+        window = (alpha, beta)
+        best_move = None
         
         if is_maximizing:
             max_eval = -float('inf')
-            for child in state_node.children:
-                eval, path = self._alpha_beta_cached(child, False, alpha, beta, cache)
+            for child_index, (move, child) in enumerate(self._order_child_moves(state_node, children, True,
+                                                                                  first_move)):
+                change = self._value_scale * (child.score_player1 - child.score_player2 - difference)
+                eval = self._alpha_beta_relative(child, False, alpha - change, beta - change, depth_left - 1)
+                eval += change
                 if eval > max_eval:
                     max_eval = eval
-                    optimal_path = [state_node] + path
+                    best_move = move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self._record_cutoff(state_node, move, depth_left, child_index)
                     break
-            result = (max_eval, optimal_path)
-            cache[state_hash] = result
-            return result
+            best_value = max_eval
         else:
             min_eval = float('inf')
-            for child in state_node.children:
-                eval, path = self._alpha_beta_cached(child, True, alpha, beta, cache)
+            for child_index, (move, child) in enumerate(self._order_child_moves(state_node, children, False,
+                                                                                  first_move)):
+                change = self._value_scale * (child.score_player1 - child.score_player2 - difference)
+                eval = self._alpha_beta_relative(child, True, alpha - change, beta - change, depth_left - 1)
+                eval += change
                 if eval < min_eval:
                     min_eval = eval
-                    optimal_path = [state_node] + path
+                    best_move = move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self._record_cutoff(state_node, move, depth_left, child_index)
                     break
-            result = (min_eval, optimal_path)
-            cache[state_hash] = result
-            return result
+            best_value = min_eval
+        table.store(entry_key, depth_left, (best_value, best_move, self._get_bound(best_value, *window)))
+        return best_value
+
+    def _pvs_cached(self, state_node, is_maximizing, depth_left: int = None):
+        if depth_left is None:
+            depth_left = self._get_search_depth(state_node)
+        value = self._pvs_relative(state_node, is_maximizing, -float('inf'), float('inf'), depth_left)
+        path = self._get_principal_variation(state_node, is_maximizing, depth_left, value)
+        return self._to_score(state_node, value), path
+
+    def _pvs_relative(self, state_node, is_maximizing, alpha, beta, depth_left: int):
+        """
+        Principal variation search: the first move is searched with the full window, the others only with a
+        null window to prove they are not better. As values are integers the null window is one unit wide.
+        A move that turns out better is searched again with the full window.
+        """
+        table = self.transposition_table
+        entry_key = self._get_entry_key(state_node, depth_left, is_maximizing)
+        entry = table.get(entry_key)
+        if entry is not None:
+            alpha, beta = self._apply_entry(entry, alpha, beta)
+            if alpha >= beta:
+                return entry[0]
+        first_move = entry[1] if entry is not None else None
+
+        self._count_node(state_node)
+
+        if self.tablebase is not None:
+            value = self._probe_tablebase(state_node, is_maximizing)
+            if value is not None:
+                table.store(entry_key, depth_left, (value, None, exact))
+                return value
+
+        children = state_node.children
+        if not children:
+            value = self._get_pattern_score(state_node)
+            table.store(entry_key, depth_left, (value, None, exact))
+            return value
+
+        difference = state_node.score_player1 - state_node.score_player2
+        window = (alpha, beta)
+        best_value = -float('inf') if is_maximizing else float('inf')
+        best_move = None
+        for child_index, (move, child) in enumerate(self._order_child_moves(state_node, children, is_maximizing,
+                                                                              first_move)):
+            change = self._value_scale * (child.score_player1 - child.score_player2 - difference)
+            if best_move is None:
+                value = self._pvs_relative(child, not is_maximizing, alpha - change, beta - change,
+                                                  depth_left - 1)
+            else:
+                null_alpha = alpha if is_maximizing else beta - 1
+                value = self._pvs_relative(child, not is_maximizing, null_alpha - change,
+                                                  null_alpha + 1 - change, depth_left - 1)
+                if alpha < value + change < beta:
+                    value = self._pvs_relative(child, not is_maximizing, alpha - change, beta - change,
+                                                      depth_left - 1)
+            value += change
+            if best_move is None or (value > best_value if is_maximizing else value < best_value):
+                best_value = value
+                best_move = move
+            if is_maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if beta <= alpha:
+                self._record_cutoff(state_node, move, depth_left, child_index)
+                break
+
+        table.store(entry_key, depth_left, (best_value, best_move, self._get_bound(best_value, *window)))
+        return best_value
+
+    def _mtdf(self, state_node, is_maximizing, depth_left: int = None):
+        """
+        MTD(f): narrows the value down with null-window alpha-beta searches, each of which either raises the
+        lower bound or lowers the upper bound. The first guess is the value of an earlier search of the state,
+        or else the leaf value predicted by the previous move.
+        The transposition table keeps the passes from searching the same nodes again.
+        The best moves of the path are found from the entries the passes left behind.
+        """
+        if depth_left is None:
+            depth_left = self._get_search_depth(state_node)
+        difference = self._value_scale * (state_node.score_player1 - state_node.score_player2)
+        entry = self.transposition_table.get(self._get_entry_key(state_node, depth_left, is_maximizing))
+        if entry is not None:
+            guess = entry[0]
+        elif self._mtdf_guess is not None:
+            guess = self._mtdf_guess - difference
+        else:
+            guess = 0
+        lower, upper = -float('inf'), float('inf')
+        self.mtdf_passes = 0
+        while lower < upper:
+            beta = max(guess, lower + 1)
+            guess = self._alpha_beta_relative(state_node, is_maximizing, beta - 1, beta, depth_left)
+            self.mtdf_passes += 1
+            if guess < beta:
+                upper = guess
+            else:
+                lower = guess
+        value = guess
+        self._mtdf_guess = difference + value
+        path = self._get_principal_variation(state_node, is_maximizing, depth_left, value)
+        return self._to_score(state_node, value), path
+
+    def _order_child_moves(self, state_node, children, is_maximizing: bool, first_move: int = None) -> list:
+        """
+        Returns the (move, child) pairs of a state in the order alpha-beta searches them, likely best first:
+        'first_move' (the best move of an earlier search of the state), then by the one-ply heuristic estimate
+        of the child, then killer moves of the sequence length first and the rest by their history score.
+        """
+        child_moves = GameTree._get_child_moves(state_node, children)
+        ordering = self.move_ordering
+        if not ordering or len(child_moves) < 2:
+            return child_moves
+        if "table" not in ordering:
+            first_move = None
+        killers = self._killer_moves.get(state_node.length, ()) if "killer" in ordering else ()
+        use_heuristic = "heuristic" in ordering
+        history = self._history if "history" in ordering else {}
+        bits, length = state_node.bits, state_node.length
+        sign = -1 if is_maximizing else 1
+        difference = state_node.score_player1 - state_node.score_player2
+
+        def get_order(child_move):
+            move, child = child_move
+            estimate = 0
+            if use_heuristic:
+                estimate = sign * (self._value_scale * (child.score_player1 - child.score_player2 - difference)
+                                   + child.pattern_score)
+            pair_type = (bits >> (length - 2 - move)) & 3
+            return move != first_move, estimate, move not in killers, -history.get(move << 2 | pair_type, 0)
+
+        child_moves.sort(key=get_order)
+        return child_moves
+
+    def _record_cutoff(self, state_node, move: int, depth_left: int, child_index: int):
+        """
+        Remembers a move that caused a cutoff as a killer move of the sequence length and in the history table.
+        'child_index' is the position of the move in the search order, counted in the statistics.
+        """
+        self.stats.record_cutoff(child_index)
+        killers = self._killer_moves.setdefault(state_node.length, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        key = move << 2 | (state_node.bits >> (state_node.length - 2 - move)) & 3
+        self._history[key] = self._history.get(key, 0) + depth_left * depth_left
+
+    @staticmethod
+    def _apply_entry(entry, alpha, beta) -> tuple:
+        """
+        Narrows the (alpha, beta) window with a transposition table entry. The returned window is empty
+        (alpha >= beta) when the entry's value can be returned without searching.
+        """
+        value, _, bound = entry
+        if bound == exact:
+            return value, value
+        if bound == lower_bound:
+            return max(alpha, value), beta
+        return alpha, min(beta, value)
+
+    @staticmethod
+    def _get_bound(value, alpha, beta) -> int:
+        """
+        Bound of a fail-soft search result in the (alpha, beta) window: a value at or below alpha only bounds
+        the exact value from above, a value at or above beta only from below.
+        """
+        if value <= alpha:
+            return upper_bound
+        if value >= beta:
+            return lower_bound
+        return exact
+
+    def _iterative_deepening(self, state_node, is_maximizing: bool):
+        """
+        Anytime search: depth-limited alpha-beta searches, one ply deeper each iteration, until the tree is searched
+        to its leaves or self.time_limit seconds have passed. The best moves found by an iteration are searched
+        first by the next one. The first iteration always completes, so there is a move however short the limit is.
+        Returns (score, path) of the deepest completed iteration, its depth is kept in self.completed_depth.
+        """
+        deadline = time.perf_counter() + self.time_limit
+        best_moves = {}
+        result = None
+        for depth in range(1, max(self._get_search_depth(state_node), 1) + 1):
+            self._search_deadline = deadline if result is not None else None
+            try:
+                value = self._depth_limited_relative(state_node, is_maximizing, depth,
+                                                     -float('inf'), float('inf'), best_moves)
+            except _SearchTimeout:
+                break
+            result = value, depth
+            self.completed_depth = depth
+            self.stats.completed_depth = depth
+            self._run_hooks("iteration")
+            if time.perf_counter() >= deadline:
+                break
+        self._search_deadline = None
+        value, depth = result
+        path = self._get_principal_variation(state_node, is_maximizing, depth, value)
+        return self._to_score(state_node, value), path
+
+    def _depth_limited_relative(self, state_node, is_maximizing, depth_left, alpha, beta, best_moves):
+        """
+        Alpha-beta search of 'depth_left' plies, evaluating the pattern score where the depth runs out.
+        The best move of every searched state is kept in 'best_moves' and searched first when the state is searched
+        again in the next iteration.
+        """
+        if self._search_deadline is not None and time.perf_counter() > self._search_deadline:
+            raise _SearchTimeout()
+
+        table = self.transposition_table
+        entry_key = self._get_entry_key(state_node, depth_left, is_maximizing)
+        entry = table.get(entry_key)
+        if entry is not None:
+            alpha, beta = self._apply_entry(entry, alpha, beta)
+            if alpha >= beta:
+                return entry[0]
+
+        self._count_node(state_node)
+
+        if self.tablebase is not None:
+            value = self._probe_tablebase(state_node, is_maximizing)
+            if value is not None:
+                table.store(entry_key, depth_left, (value, None, exact))
+                return value
+
+        children = state_node.children if depth_left else None
+        if not children:
+            value = self._get_pattern_score(state_node)
+            table.store(entry_key, depth_left, (value, None, exact))
+            return value
+
+        state_hash = self._get_state_hash(state_node)
+        first_move = best_moves.get(state_hash)
+        if first_move is None and entry is not None:
+            first_move = entry[1]
+
+        difference = state_node.score_player1 - state_node.score_player2
+        window = (alpha, beta)
+        best_value = -float('inf') if is_maximizing else float('inf')
+        best_move = None
+        for child_index, (move, child) in enumerate(self._order_child_moves(state_node, children, is_maximizing,
+                                                                              first_move)):
+            change = self._value_scale * (child.score_player1 - child.score_player2 - difference)
+            value = self._depth_limited_relative(child, not is_maximizing, depth_left - 1,
+                                                        alpha - change, beta - change, best_moves)
+            value += change
+            if value > best_value if is_maximizing else value < best_value:
+                best_value = value
+                best_move = move
+            if is_maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if beta <= alpha:
+                self._record_cutoff(state_node, move, depth_left, child_index)
+                break
+
+        best_moves[state_hash] = best_move
+        table.store(entry_key, depth_left, (best_value, best_move, self._get_bound(best_value, *window)))
+        return best_value
+
+    def _backward_induction(self, state_node, is_maximizing: bool):
+        value, path = self._backward_induction_relative(state_node, is_maximizing)
+        return self._to_score(state_node, value), path
+
+    def _backward_induction_relative(self, state_node, is_maximizing: bool) -> tuple:
+        """
+        Solves the tree below 'state_node' without recursion: the unique nodes are collected layer by layer,
+        then every layer is evaluated from the leaves up in one sweep (see _solve_layer).
+        Values are absolute, score difference * _value_scale plus the pattern score of the leaf, so the values of
+        shared children are used by all their parents. The path follows the first child in move order reaching
+        the value of its parent, the move minimax would choose. Returns a tuple (relative value, path).
+        """
+        with self.stats.timer("layers"):
+            layers = self._get_layers(state_node)
+        self.nodes_visited += sum(len(layer) for layer in layers)
+        for depth, layer in enumerate(layers):
+            self.stats.record_nodes(self._root_length - state_node.length + depth, len(layer))
+        pool = state_node.pool
+        values = np.zeros(len(pool), dtype=np.int64) if np is not None else {}
+        with self.stats.timer("solve"):
+            for depth in range(len(layers) - 1, -1, -1):
+                self._check_cancelled()
+                is_tablebase_layer = (depth > 0 and self.tablebase is not None
+                                      and pool.length[layers[depth][0]] <= self.tablebase.max_length)
+                self._solve_layer(pool, layers[depth], is_maximizing == (depth % 2 == 0), is_tablebase_layer,
+                                  values)
+
+        path = [state_node]
+        for _ in range(len(layers) - 1):
+            value = values[path[-1].index]
+            for _, child in GameTree._get_child_moves(path[-1]):
+                if values[child.index] == value:
+                    path.append(child)
+                    break
+        value = int(values[state_node.index])
+        return value - self._value_scale * (state_node.score_player1 - state_node.score_player2), path
+
+    def _get_layers(self, state_node) -> list:
+        """
+        Returns the unique pool nodes of every layer below 'state_node', starting with the state itself.
+        Layers of positions answered by the tablebase end the list, they are not expanded.
+        Nodes of lazy trees are expanded here, before any column is viewed as a NumPy array.
+        """
+        pool = state_node.pool
+        layers = [array('I', [state_node.index])]
+        while True:
+            self._check_cancelled()
+            layer = layers[-1]
+            if len(layers) > 1 and self.tablebase is not None and pool.length[layer[0]] <= self.tablebase.max_length:
+                return layers
+            if pool.expander is not None:
+                for node in layer:
+                    if not pool.child_count[node]:
+                        pool.expander(node)
+            next_layer = {}
+            for node in layer:
+                for edge in pool.get_children(node):
+                    next_layer[edge >> 1] = None
+            if not next_layer:
+                return layers
+            layers.append(array('I', next_layer))
+
+    def _solve_layer(self, pool: NodePool, layer: array, is_maximizing: bool, is_tablebase_layer: bool, values):
+        """
+        Computes the absolute values of all nodes of one layer into 'values', a NumPy array or a dict indexed by node.
+        Inner nodes take the best value of their children, which are all on the layer below and already solved.
+        With NumPy the children of the whole layer are gathered from the pool's edge column at once and reduced
+        per parent with one reduceat. Leaves are evaluated with evaluate_layer, or by the tablebase.
+        """
+        if is_tablebase_layer:
+            for node in layer:
+                state = GameState._view(pool, node)
+                values[node] = (self._value_scale * (state.score_player1 - state.score_player2)
+                                + self._probe_tablebase(state, is_maximizing))
+            return
+        if np is None:
+            best = max if is_maximizing else min
+            leaves = []
+            for node in layer:
+                edges = pool.get_children(node)
+                if edges:
+                    values[node] = best(values[edge >> 1] for edge in edges)
+                else:
+                    leaves.append(node)
+            for node, value in zip(leaves, self.evaluate_layer(pool, leaves)):
+                values[node] = value
+            return
+
+        nodes = np.frombuffer(layer, dtype=np.uint32).astype(np.intp)
+        counts = np.frombuffer(pool.child_count, dtype=np.uint8)[nodes].astype(np.intp)
+        parents = nodes[counts > 0]
+        if len(parents):
+            counts = counts[counts > 0]
+            starts = np.cumsum(counts) - counts
+            positions = (np.repeat(np.frombuffer(pool.child_offset, dtype=np.uint32)[parents] - starts, counts)
+                         + np.arange(counts.sum()))
+            children = (np.frombuffer(pool.child_index, dtype=np.uint32)[positions] >> 1).astype(np.intp)
+            best = np.maximum if is_maximizing else np.minimum
+            values[parents] = best.reduceat(values[children], starts)
+        leaves = nodes[np.frombuffer(pool.child_count, dtype=np.uint8)[nodes] == 0]
+        if len(leaves):
+            values[leaves] = self.evaluate_layer(pool, leaves)
+
+    def _search_window(self, state_node, is_maximizing: bool, alpha, beta, depth_left: int) -> tuple:
+        """
+        Searches a state with the chosen algorithm and a relative (alpha, beta) window, minimax and backward
+        induction ignore the window. Returns (value, path), the path being None unless the value is exact.
+        """
+        if self.tablebase is not None:
+            value = self._probe_tablebase(state_node, is_maximizing)
+            if value is not None:
+                self._count_node(state_node)
+                return value, [state_node]
+        if self.algorithm == "minimax":
+            value = self._minimax_relative(state_node, is_maximizing, depth_left)
+        elif self.algorithm == "backward_induction":
+            return self._backward_induction_relative(state_node, is_maximizing)
+        elif self.algorithm == "pvs":
+            value = self._pvs_relative(state_node, is_maximizing, alpha, beta, depth_left)
+        else:
+            value = self._alpha_beta_relative(state_node, is_maximizing, alpha, beta, depth_left)
+        if not alpha < value < beta:
+            return value, None
+        return value, self._get_principal_variation(state_node, is_maximizing, depth_left, value,
+                                                    self.algorithm == "minimax")
+
+    def _parallel_root_search(self, state_node, is_maximizing: bool):
+        """
+        Root split: the children of 'state_node' are searched by self.workers processes, each task sending a child
+        as a sequence. At most one task per worker is queued, so every task starts with the window of the best
+        value found so far, and a child that cannot beat it fails low cheaply. Ties go to the child searched first,
+        as in the serial search, whose window stays open for equal values while it is still running.
+        Returns (score, path) with the path continued by the moves the worker of the best child found.
+        """
+        depth_left = self._get_search_depth(state_node)
+        children = state_node.children if depth_left else None
+        if not children:
+            self._count_node(state_node)
+            return self._to_score(state_node, self._get_pattern_score(state_node)), [state_node]
+        if self.algorithm in ("minimax", "backward_induction"):
+            child_moves = GameTree._get_child_moves(state_node, children)
+        else:
+            child_moves = self._order_child_moves(state_node, children, is_maximizing)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        options = (self.algorithm, self.canonicalize, self.tablebase.path if self.tablebase is not None else None,
+                   self.transposition_table.max_size, self.transposition_table.policy, self.move_ordering,
+                   self.check_patterns)
+        difference = state_node.score_player1 - state_node.score_player2
+
+        self._count_node(state_node)
+        best = None
+        pending = {}
+        for rank, (move, child) in enumerate(child_moves):
+            if len(pending) == self.workers:
+                best = self._merge_root_results(pending, best, is_maximizing)
+            change = self._value_scale * (child.score_player1 - child.score_player2 - difference)
+            alpha, beta = -float('inf'), float('inf')
+            if best is not None:
+                if is_maximizing:
+                    alpha = best[0]
+                else:
+                    beta = best[0]
+            task = (child.sequence, not is_maximizing, depth_left - 1, alpha - change, beta - change, options)
+            pending[self._executor.submit(_search_subtree, task)] = (rank, child, change)
+        while pending:
+            best = self._merge_root_results(pending, best, is_maximizing)
+
+        value, _, child, moves = best
+        return self._to_score(state_node, value), [state_node] + self._follow_moves(child, moves)
+
+    def _merge_root_results(self, pending: dict, best, is_maximizing: bool):
+        """
+        Waits for at least one task of the parallel search and merges the finished ones into 'best',
+        a tuple (value, rank, child, moves) of the best child so far. Returns the new best.
+        A cancelled search drops the tasks that have not started, running tasks finish in their workers.
+        """
+        done = None
+        while not done:
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                raise SearchCancelled()
+            done, _ = wait(pending, timeout=self._cancel_poll_seconds, return_when=FIRST_COMPLETED)
+        for future in done:
+            rank, child, change = pending.pop(future)
+            value, moves, stats = future.result()
+            self.nodes_visited += stats.nodes
+            self.stats.merge(stats, 1)
+            value += change
+            if best is None or (value > best[0] if is_maximizing else value < best[0]) or (
+                    value == best[0] and rank < best[1] and moves is not None):
+                best = (value, rank, child, moves)
+        return best
+
+    @staticmethod
+    def _get_path_moves(path: list) -> list:
+        """Returns the pair indices of the moves along 'path', so the path can be followed in another tree."""
+        return [GameTree._get_child_moves(parent, [child])[0][0] for parent, child in zip(path, path[1:])]
+
+    @staticmethod
+    def _follow_moves(state_node, moves: list) -> list:
+        """Returns the path from 'state_node' along 'moves', as far as the tree of the state reaches."""
+        path = [state_node]
+        for move in moves:
+            child = GameTree._find_child(path[-1], move)
+            if child is None:
+                break
+            path.append(child)
+        return path
+
+    def ponder(self, game: GameTree, cancel_event=None) -> int:
+        """
+        Searches on the opponent's time, while the opponent is to move in 'game'. The replies to the opponent's
+        moves are searched most likely move first, as this player orders the moves for the opponent (the reply
+        its last search expected, or else the best move its table holds for the state, then the best one-ply
+        scores). Each reply is searched in a tree of its own,
+        built to the depth the game tree will have after the move (see GameTree.get_depth_after_move), and its
+        result is kept. When the opponent plays a pondered move, get_path answers from it without searching.
+        Stops when 'cancel_event' is set. Returns the number of pondered replies, their nodes are counted
+        in ponder_nodes instead of nodes_visited and self.stats keeps the statistics of the last get_path.
+        """
+        self._pondered = {}
+        state = game.current_state
+        children = state.children
+        if not children or self.algorithm == "heuristic":
+            # The greedy heuristic answers at once anyway
+            return 0
+        opponent_maximizing = game.get_current_player() == 1
+        depth_left = game.get_depth_after_move()
+        # The opponent's move the last search expected, else the best move stored for the state
+        path = self.optimal_path
+        if path is not None and len(path) > 2 and path[1] is state:
+            expected_move = GameTree._get_child_moves(state, [path[2]])[0][0]
+        else:
+            entry = self.transposition_table.peek(
+                self._get_entry_key(state, self._get_search_depth(state), opponent_maximizing))
+            expected_move = entry[1] if entry is not None else None
+        # Pruning searches only expand what they visit, as in the worker trees of the parallel search
+        lazy = self.algorithm not in ("minimax", "backward_induction")
+        nodes_visited = self.nodes_visited
+        search_stats = self.stats
+        search_cancel_event = self.cancel_event
+        self.cancel_event = cancel_event
+        pondered = 0
+        try:
+            for _, child in self._order_child_moves(state, children, opponent_maximizing, expected_move):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    reply_game = GameTree(child.sequence, False, depth_left, canonicalize=game.canonicalize,
+                                          tablebase_length=game.tablebase_length, lazy=lazy,
+                                          vectorized=np is not None and not lazy,
+                                          first_player=2 if opponent_maximizing else 1, cancel_event=cancel_event)
+                root = reply_game.root
+                search_depth = self._get_search_depth(root)
+                self._start_stats(root)
+                value, path = self._search_window(root, not opponent_maximizing, -float('inf'), float('inf'),
+                                                  search_depth)
+                self._finish_stats()
+                self._pondered[self._get_entry_key(root, search_depth, not opponent_maximizing)] = (
+                    value, self._get_path_moves(path))
+                pondered += 1
+        except (SearchCancelled, BuildCancelled):
+            pass
+        finally:
+            # The statistics of the last real search stay readable for the GUI and hooks
+            self.stats = search_stats
+            self.cancel_event = search_cancel_event
+            self.ponder_nodes += self.nodes_visited - nodes_visited
+            self.nodes_visited = nodes_visited
+        return pondered
+
+    def _pop_pondered(self, state_node, is_maximizing: bool):
+        """Removes and returns the (value, moves) pondered for 'state_node' at the depth of its tree, or None."""
+        return self._pondered.pop(self._get_entry_key(state_node, self._get_search_depth(state_node), is_maximizing),
+                                  None)
 
     def _heuristic_path(self, state_node, is_maximizing: bool):
         """
         Greedy recursive approach: at each node, choose the child with the best immediate heuristic score.
         Returns a tuple (score, path), where score is the heuristic score at the terminal node.
         """
-        self.nodes_visited += 1
+        self._count_node(state_node)
 
-        if not state_node.children:
+        children = state_node.children
+        if not children:
             score = self._get_heuristic_score(state_node)
             return score, [state_node]
 
         if is_maximizing:
             best_child = None
             best_score = -float('inf')
-            for child in state_node.children:
+            for child in children:
                 child_score = self._get_heuristic_score(child)
                 if child_score > best_score:
                     best_score = child_score
@@ -188,7 +1162,7 @@ class ComputerPlayer:
         else:
             best_child = None
             best_score = float('inf')
-            for child in state_node.children:
+            for child in children:
                 child_score = self._get_heuristic_score(child)
                 if child_score < best_score:
                     best_score = child_score
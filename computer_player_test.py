@@ -1,5 +1,13 @@
-from computer_player import ComputerPlayer
-from game_tree import GameTree
+import os
+import random
+import tempfile
+import threading
+import time
+
+from computer_player import ComputerPlayer, SearchCancelled, _search_subtree, _worker_players
+from game_tree import GameState, GameTree
+from tablebase import Tablebase, write_tablebase
+import tournament
 
 str_blue = "\033[34m"
 str_red = "\033[31m"
@@ -18,14 +26,18 @@ def test_1_path_result_consistency(sequence_length_start, sequence_length_end):
         player1 = ComputerPlayer("minimax")
         player2 = ComputerPlayer("alpha_beta")
         player3 = ComputerPlayer("heuristic")
+        player4 = ComputerPlayer("pvs")
+        player5 = ComputerPlayer("mtdf")
         path1, score1 = player1.get_path(game.root, True)
         path2, score2 = player2.get_path(game.root, True)
         path3, score3 = player3.get_path(game.root, True)
+        path4, score4 = player4.get_path(game.root, True)
+        path5, score5 = player5.get_path(game.root, True)
         
-        if score1 == score2 and score2 == score3:
-            print(f"\033[92m Path result consistency test, sequence:{seq_string} - Passed (Nodes visited: minimax {player1.nodes_visited}, alpha-beta {player2.nodes_visited}, pure heuristics {player3.nodes_visited}) \033[0m")
+        if score1 == score2 and score2 == score3 and score1 == score4 and score1 == score5:
+            print(f"\033[92m Path result consistency test, sequence:{seq_string} - Passed (Nodes visited: minimax {player1.nodes_visited}, alpha-beta {player2.nodes_visited}, pvs {player4.nodes_visited}, mtdf {player5.nodes_visited}, pure heuristics {player3.nodes_visited}) \033[0m")
         else:
-            print(f"\033[91m Path result consistency test, sequence:{seq_string} - Failed (Minimax:{score1} != AlphaBeta:{score2} != Heuristics:{score3}) \033[0m")
+            print(f"\033[91m Path result consistency test, sequence:{seq_string} - Failed (Minimax:{score1} != AlphaBeta:{score2} != PVS:{score4} != MTD(f):{score5} != Heuristics:{score3}) \033[0m")
             print(f"Minimax path:")
             player1.print_path()
             print(f"AlphaBeta path:")
@@ -129,6 +141,532 @@ def test_2_minimax_vs_alpha_beta_play(sequence, depth_limit):
     
     
 
+def test_3_complement_symmetry(max_length=7, depth_limit=4):
+    """Checks that canonicalized trees and caches give the same results as un-canonicalized search."""
+    print("Complement symmetry test for sequence length up to", max_length)
+    failed = 0
+    nodes_plain = nodes_canonical = 0
+    for n in range(2, max_length + 1):
+        for value in range(2 ** n):
+            sequence = format(value, f"0{n}b")
+            complement = format(value ^ (2 ** n - 1), f"0{n}b")
+            for depth in (depth_limit, n):
+                plain_tree = GameTree(sequence, False, depth, canonicalize=False)
+                complement_tree = GameTree(complement, False, depth, canonicalize=False)
+                canonical_tree = GameTree(sequence, False, depth, canonicalize=True)
+                nodes_plain += len(plain_tree.pool)
+                nodes_canonical += len(canonical_tree.pool)
+                for algorithm in ("minimax", "alpha_beta"):
+                    player = ComputerPlayer(algorithm, canonicalize=True)
+                    path1, score1 = ComputerPlayer(algorithm, canonicalize=False).get_path(plain_tree.root, True)
+                    _, score2 = ComputerPlayer(algorithm, canonicalize=False).get_path(complement_tree.root, True)
+                    path3, score3 = player.get_path(canonical_tree.root, True)
+                    # Alpha-beta may pick another of several equally good paths, depending on the cache hits
+                    if algorithm == "minimax":
+                        same_path = [s.sequence for s in path1] == [s.sequence for s in path3]
+                    else:
+                        same_path = player._get_heuristic_score(path3[-1]) == score3
+                    if not (score1 == score2 == score3) or not same_path:
+                        failed += 1
+                        print(f"{str_red} {sequence}, depth {depth}, {algorithm}: plain {score1}, complement {score2}, canonical {score3} {str_reset}")
+    if not failed:
+        print(f"{str_green} Complement symmetry test - Passed (nodes: plain {nodes_plain}, canonical {nodes_canonical}) {str_reset}")
+    assert failed == 0
+
+
+def test_4_tablebase(max_length=8):
+    """Compares tablebase answers with full depth minimax for every sequence up to max_length."""
+    print("Tablebase test for sequence length up to", max_length)
+    path = os.path.join(tempfile.mkdtemp(), "tablebase.bin")
+    write_tablebase(path, max_length)
+    tablebase = Tablebase(path)
+    failed = 0
+    for n in range(2, max_length + 1):
+        for value in range(2 ** n):
+            sequence = format(value, f"0{n}b")
+            full_tree = GameTree(sequence, False, n)
+            # The tablebase player must not need anything below the first layer
+            short_tree = GameTree(sequence, False, n, tablebase_length=max_length)
+            player = ComputerPlayer("alpha_beta", tablebase=tablebase)
+            # Check the first move of player 1 and the reply of player 2
+            for is_maximizing in (True, False):
+                _, expected = ComputerPlayer("minimax").get_path(full_tree.current_state, is_maximizing)
+                path, score = player.get_path(short_tree.current_state, is_maximizing)
+                if (score != expected or len(path) != short_tree.current_state.length
+                        or path[1] not in short_tree.current_state.children
+                        or path[-1].score_player1 - path[-1].score_player2 != score):
+                    failed += 1
+                    print(f"{str_red} {sequence}, maximizing {is_maximizing}: minimax {expected}, tablebase {score} {str_reset}")
+                if short_tree.current_state.length < 3:
+                    break
+                full_tree.move_to_next_state_by_move(0)
+                short_tree.move_to_next_state_by_move(0)
+    tablebase.close()
+    if not failed:
+        print(f"{str_green} Tablebase test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_5_lazy_tree(sequence_lengths=(8, 12, 14), depth_limit=6, seed=5):
+    """Plays games on eager and lazy trees side by side, expecting the same moves with fewer nodes created."""
+    print("Lazy tree test")
+    rng = random.Random(seed)
+    failed = 0
+    for n in sequence_lengths:
+        sequence = "".join(rng.choice("01") for _ in range(n))
+        eager_tree = GameTree(sequence, False, depth_limit)
+        lazy_tree = GameTree(sequence, False, depth_limit, lazy=True)
+        player = ComputerPlayer("alpha_beta")
+        lazy_player = ComputerPlayer("alpha_beta")
+        while eager_tree.current_state.children:
+            is_player1 = eager_tree.get_current_player() == 1
+            path, score = player.get_path(eager_tree.current_state, is_player1)
+            lazy_path, lazy_score = lazy_player.get_path(lazy_tree.current_state, is_player1)
+            if score != lazy_score or path[1].sequence != lazy_path[1].sequence:
+                failed += 1
+                print(f"{str_red} {sequence}, move {eager_tree.current_depth}: eager {score}, lazy {lazy_score} {str_reset}")
+                break
+            if eager_tree.current_depth == 0:
+                lazy_tree.print_lazy_stats()
+            eager_tree.move_to_next_state_by_child(path[1])
+            lazy_tree.move_to_next_state_by_child(lazy_path[1])
+    if not failed:
+        print(f"{str_green} Lazy tree test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_6_iterative_deepening(max_length=7, depth_limit=4):
+    """Expects iterative deepening without a deadline to match minimax, and a move within a tiny time limit."""
+    print("Iterative deepening test for sequence length up to", max_length)
+    failed = 0
+    for n in range(2, max_length + 1):
+        for value in range(2 ** n):
+            sequence = format(value, f"0{n}b")
+            for depth in (depth_limit, n):
+                game = GameTree(sequence, False, depth)
+                _, expected = ComputerPlayer("minimax").get_path(game.root, True)
+                path, score = ComputerPlayer("alpha_beta", time_limit=60).get_path(game.root, True)
+                if score != expected or path[1] not in game.root.children:
+                    failed += 1
+                    print(f"{str_red} {sequence}, depth {depth}: minimax {expected}, iterative deepening {score} {str_reset}")
+    game = GameTree("0110100111010011010110", False, 22, lazy=True)
+    player = ComputerPlayer("alpha_beta", time_limit=0.05)
+    path, score = player.get_path(game.root, True)
+    if path[1] not in game.root.children:
+        failed += 1
+        print(f"{str_red} Time limited search returned an illegal move {str_reset}")
+    if not failed:
+        print(f"{str_green} Iterative deepening test - Passed (22 digits in 0.05 seconds: depth {player.completed_depth}) {str_reset}")
+    assert failed == 0
+
+
+def test_7_transposition_table(sequence="011010011101", depth_limit=5, table_size=200):
+    """Plays a game with players that keep small bounded tables and compares every move with fresh players."""
+    print("Transposition table test")
+    failed = 0
+    for replacement in ("lru", "depth"):
+        game = GameTree(sequence, False, depth_limit)
+        player = ComputerPlayer("minimax", table_size=table_size, replacement=replacement)
+        while game.current_state.children:
+            is_player1 = game.get_current_player() == 1
+            path, score = player.get_path(game.current_state, is_player1)
+            _, expected = ComputerPlayer("minimax").get_path(game.current_state, is_player1)
+            if score != expected or len(player.transposition_table) > table_size:
+                failed += 1
+                print(f"{str_red} {replacement}, move {game.current_depth}: fresh {expected}, kept table {score} {str_reset}")
+            game.move_to_next_state_by_child(path[1])
+        table = player.transposition_table
+        if not table.evictions:
+            failed += 1
+            print(f"{str_red} {replacement}: no evictions from a full table {str_reset}")
+        print(f"{str_blue} {replacement}: {table.hits} hits, {table.misses} misses, {table.evictions} evictions {str_reset}")
+    # Searching the same state again is answered from the table
+    game = GameTree(sequence, False, depth_limit)
+    player = ComputerPlayer("alpha_beta")
+    player.get_path(game.root, True)
+    player.reset_counter()
+    player.get_path(game.root, True)
+    if player.nodes_visited:
+        failed += 1
+        print(f"{str_red} Repeated search visited {player.nodes_visited} nodes {str_reset}")
+    if not failed:
+        print(f"{str_green} Transposition table test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_8_alpha_beta_bounds(sequence_length=9, depth_limit=4, seed=8):
+    """
+    Compares alpha-beta with _minimax_cached for every sequence of the given length. One alpha-beta player
+    searches all of them, with full and random narrow windows, so bound entries of earlier searches are reused.
+    A fail-soft result outside the window must lie between the window and the minimax value.
+    """
+    print("Alpha-beta bound entries test for sequence length", sequence_length)
+    rng = random.Random(seed)
+    failed = 0
+    player = ComputerPlayer("alpha_beta")
+    for value in range(2 ** sequence_length):
+        sequence = format(value, f"0{sequence_length}b")
+        for depth in (depth_limit, sequence_length):
+            game = GameTree(sequence, False, depth)
+            for is_maximizing in (True, False):
+                expected, _ = ComputerPlayer("minimax")._minimax_cached(game.root, is_maximizing)
+                alpha = rng.randint(-4, 3) + 0.0005
+                beta = alpha + rng.choice((0.001, 1, 2))
+                score, _ = player._alpha_beta_cached(game.root, is_maximizing, alpha, beta)
+                if expected <= alpha:
+                    correct = expected <= score <= alpha
+                elif expected >= beta:
+                    correct = beta <= score <= expected
+                else:
+                    correct = score == expected
+                full_score, path = player._alpha_beta_cached(game.root, is_maximizing)
+                if not correct or full_score != expected or path[-1].children:
+                    failed += 1
+                    print(f"{str_red} {sequence}, depth {depth}: minimax {expected}, alpha-beta {full_score}, "
+                          f"window ({alpha}, {beta}) {score} {str_reset}")
+    if not failed:
+        table = player.transposition_table
+        print(f"{str_green} Alpha-beta bound entries test - Passed ({table.hits} hits, {table.misses} misses) {str_reset}")
+    assert failed == 0
+
+
+def test_9_move_ordering(sequence_lengths=(12, 15, 18), depth_limit=7, seed=9):
+    """Reports the nodes visited by minimax and by alpha-beta with and without move ordering."""
+    print("Move ordering test")
+    rng = random.Random(seed)
+    failed = 0
+    orderings = [(), ("table",), ("table", "heuristic"), ComputerPlayer.move_orderings]
+    for n in sequence_lengths:
+        sequence = "".join(rng.choice("01") for _ in range(n))
+        game = GameTree(sequence, False, depth_limit)
+        minimax = ComputerPlayer("minimax")
+        _, expected = minimax.get_path(game.root, True)
+        report = [f"minimax {minimax.nodes_visited}"]
+        for ordering in orderings:
+            player = ComputerPlayer("alpha_beta", move_ordering=ordering)
+            _, score = player.get_path(game.root, True)
+            report.append(f"{'+'.join(ordering) or 'unordered'} {player.nodes_visited}")
+            if score != expected:
+                failed += 1
+                print(f"{str_red} {sequence}, ordering {ordering}: minimax {expected}, alpha-beta {score} {str_reset}")
+        print(f"{str_blue} {sequence}: {', '.join(report)} {str_reset}")
+    if not failed:
+        print(f"{str_green} Move ordering test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_10_null_window_search(max_length=8, depth_limit=4):
+    """Compares pvs and mtdf with minimax for every sequence up to max_length and reports the nodes visited."""
+    print("Null-window search test for sequence length up to", max_length)
+    failed = 0
+    algorithms = ("minimax", "alpha_beta", "pvs", "mtdf")
+    nodes = dict.fromkeys(algorithms, 0)
+    passes = 0
+    for n in range(2, max_length + 1):
+        for value in range(2 ** n):
+            sequence = format(value, f"0{n}b")
+            for depth in (depth_limit, n):
+                game = GameTree(sequence, False, depth)
+                scores = []
+                for algorithm in algorithms:
+                    player = ComputerPlayer(algorithm)
+                    path, score = player.get_path(game.root, True)
+                    if player._get_heuristic_score(path[-1]) != score:
+                        score = None
+                    scores.append(score)
+                    nodes[algorithm] += player.nodes_visited
+                    passes += player.mtdf_passes
+                if len(set(scores)) != 1 or None in scores:
+                    failed += 1
+                    print(f"{str_red} {sequence}, depth {depth}: {dict(zip(algorithms, scores))} {str_reset}")
+    report = ", ".join(f"{algorithm} {count}" for algorithm, count in nodes.items())
+    print(f"{str_blue} Nodes visited: {report}, mtdf passes {passes} {str_reset}")
+    if not failed:
+        print(f"{str_green} Null-window search test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_11_pattern_check_mode(sequence_lengths=(10, 14, 18), depth_limit=5, seed=11):
+    """Plays games with every algorithm in check mode, which asserts incremental and recounted patterns are equal."""
+    print("Pattern check mode test")
+    rng = random.Random(seed)
+    for n in sequence_lengths:
+        sequence = "".join(rng.choice("01") for _ in range(n))
+        for algorithm in ("minimax", "alpha_beta", "pvs", "mtdf", "heuristic"):
+            game = GameTree(sequence, False, depth_limit, lazy=algorithm == "alpha_beta")
+            player = ComputerPlayer(algorithm, check_patterns=True)
+            while game.current_state.children:
+                path, _ = player.get_path(game.current_state, game.get_current_player() == 1)
+                game.move_to_next_state_by_child(path[1])
+    print(f"{str_green} Pattern check mode test - Passed {str_reset}")
+
+
+def test_12_batch_evaluation(sequence_lengths=(9, 13, 17), depth_limit=6, seed=12):
+    """Evaluates the last built layer of random trees at once and compares every value with the per-node evaluation."""
+    print("Batch evaluation test")
+    rng = random.Random(seed)
+    player = ComputerPlayer("minimax", check_patterns=True)
+    for n in sequence_lengths:
+        game = GameTree("".join(rng.choice("01") for _ in range(n)), False, depth_limit)
+        layer = game._last_build_layer
+        values = player.evaluate_layer(game.pool, layer)
+        assert len(values) == len(layer), "Batch evaluation must return one value per node."
+        for node, value in zip(layer, values):
+            state = GameState._view(game.pool, node)
+            state_score = state.score_player1 - state.score_player2
+            expected = player._value_scale * state_score + player._get_pattern_score(state)
+            assert value == expected, f"Batch value {value} of {state} differs from {expected}."
+    print(f"{str_green} Batch evaluation test - Passed {str_reset}")
+
+
+def test_13_backward_induction(sequence_lengths=(6, 10, 14, 17), depth_limit=7, seed=13):
+    """Plays games where both players solve the tree layer by layer and checks every move against minimax."""
+    print("Backward induction test")
+    rng = random.Random(seed)
+    failed = 0
+    for n in sequence_lengths:
+        sequence = "".join(rng.choice("01") for _ in range(n))
+        for lazy in (False, True):
+            game = GameTree(sequence, False, depth_limit, lazy=lazy)
+            player = ComputerPlayer("backward_induction", check_patterns=True)
+            while game.current_state.children:
+                is_maximizing = game.get_current_player() == 1
+                path, score = player.get_path(game.current_state, is_maximizing)
+                expected_path, expected = ComputerPlayer("minimax").get_path(game.current_state, is_maximizing)
+                if score != expected or path != expected_path:
+                    failed += 1
+                    print(f"{str_red} {game.current_state.sequence}: minimax {expected}, layers {score} {str_reset}")
+                game.move_to_next_state_by_child(path[1])
+    if not failed:
+        print(f"{str_green} Backward induction test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_14_parallel_search(sequence="0110100111010", depth_limit=6, worker_counts=(1, 2, 4)):
+    """
+    Plays a game with every algorithm searched by several worker processes and checks each move against the serial
+    search. Minimax and backward induction must find the same path, the others the same score.
+    Prints the search time and speedup per worker count.
+    """
+    print("Parallel search test with workers", worker_counts)
+    failed = 0
+    for algorithm in ("minimax", "alpha_beta", "pvs", "mtdf", "backward_induction"):
+        times = {}
+        for workers in worker_counts:
+            game = GameTree(sequence, False, depth_limit)
+            player = ComputerPlayer(algorithm, workers=workers)
+            times[workers] = 0.0
+            while game.current_state.children:
+                is_maximizing = game.get_current_player() == 1
+                start_time = time.perf_counter()
+                path, score = player.get_path(game.current_state, is_maximizing)
+                times[workers] += time.perf_counter() - start_time
+                expected_path, expected = ComputerPlayer(algorithm).get_path(game.current_state, is_maximizing)
+                if score != expected or (algorithm in ("minimax", "backward_induction") and path != expected_path):
+                    failed += 1
+                    print(f"{str_red} {algorithm}, {workers} workers, {game.current_state.sequence}: "
+                          f"serial {expected}, parallel {score} {str_reset}")
+                game.move_to_next_state_by_child(path[1])
+            player.close()
+        report = ", ".join(f"{workers} workers {seconds:.2f}s ({times[worker_counts[0]] / seconds:.2f}x)"
+                           for workers, seconds in times.items())
+        print(f"{str_blue} {algorithm}: {report} {str_reset}")
+    # Workers build their trees and players with the caller's canonicalization and check mode
+    options = ("alpha_beta", False, None, 1000, "lru", ("table", "heuristic"), True)
+    _search_subtree((sequence, True, 3, -float('inf'), float('inf'), options))
+    worker_player = _worker_players.pop(options)
+    if worker_player.canonicalize or not worker_player.check_patterns:
+        failed += 1
+        print(f"{str_red} Worker player ignores canonicalize or check_patterns {str_reset}")
+    game = GameTree(sequence, False, depth_limit, canonicalize=False)
+    player = ComputerPlayer("alpha_beta", canonicalize=False, check_patterns=True, workers=2)
+    _, score = player.get_path(game.current_state, True)
+    player.close()
+    _, expected = ComputerPlayer("alpha_beta", canonicalize=False).get_path(game.current_state, True)
+    if score != expected:
+        failed += 1
+        print(f"{str_red} Uncanonicalized parallel search: serial {expected}, parallel {score} {str_reset}")
+    if not failed:
+        print(f"{str_green} Parallel search test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_15_search_stats(sequence="01101001110100", depth_limit=7):
+    """Checks the search statistics of every algorithm for consistency, and the hook and profiling options."""
+    print("Search statistics test")
+    game = GameTree(sequence, False, depth_limit)
+    failed = 0
+    for algorithm in ("minimax", "alpha_beta", "pvs", "mtdf", "backward_induction", "heuristic"):
+        for time_limit in (None, 10):
+            player = ComputerPlayer(algorithm, time_limit=time_limit, profile=algorithm == "pvs")
+            events = []
+            player.add_hook(lambda event, stats: events.append((event, stats.completed_depth)))
+            player.get_path(game.root, True)
+            stats = player.stats
+            iterations = [depth for event, depth in events if event == "iteration"]
+            problems = [problem for problem, found in (
+                ("node count", stats.nodes != player.nodes_visited or stats.nodes_per_depth[0] < 1),
+                ("depth", stats.depth != depth_limit or len(stats.nodes_per_depth) > depth_limit + 1),
+                ("cutoffs", stats.cutoffs != sum(stats.cutoff_child_index)),
+                ("table", stats.table_stores > player.transposition_table.stores),
+                ("events", events[0][0] != "start" or events[-1][0] != "end"),
+                ("iterations", iterations != (list(range(1, depth_limit + 1))
+                                              if time_limit and algorithm != "heuristic" else [])),
+                ("profile", (stats.profile is not None) != (algorithm == "pvs")),
+                ("timing", stats.phase_seconds["total"] <= 0)) if found]
+            if problems:
+                failed += 1
+                print(f"{str_red} {algorithm}, time limit {time_limit}: {', '.join(problems)} {str_reset}")
+                stats.print_stats()
+    # A table too small to keep the search makes minimax check the path's moves with searches of their own
+    small_game = GameTree(sequence[:10], False, depth_limit)
+    player = ComputerPlayer("minimax", table_size=20)
+    _, score = player.get_path(small_game.root, True)
+    if player.stats.cutoffs or score != ComputerPlayer("minimax").get_path(small_game.root, True)[1]:
+        failed += 1
+        print(f"{str_red} minimax with a small table: {player.stats.cutoffs} cutoffs, score {score} {str_reset}")
+    if not failed:
+        print(f"{str_green} Search statistics test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_16_cancel_search(sequence="0110100111010011010110", depth_limit=8, check_sequence="01101001110100"):
+    """Cancels searches from another thread, then checks the player still finds the same results as a new player."""
+    print("Search cancellation test")
+    game = GameTree(sequence, False, depth_limit, lazy=True)
+    check_game = GameTree(check_sequence, False, 7)
+    failed = 0
+    for algorithm in ("minimax", "alpha_beta", "pvs", "mtdf", "backward_induction"):
+        for time_limit in (None, 60):
+            cancel_event = threading.Event()
+            player = ComputerPlayer(algorithm, time_limit=time_limit, cancel_event=cancel_event)
+            timer = threading.Timer(0.05, cancel_event.set)
+            timer.start()
+            start_time = time.perf_counter()
+            try:
+                player.get_path(game.root, True)
+                cancelled = False
+            except SearchCancelled:
+                cancelled = True
+            elapsed = time.perf_counter() - start_time
+            timer.join()
+            player.cancel_event = threading.Event()
+            if not cancelled or elapsed > 1 or (player.get_path(check_game.root, True)[1]
+                                                != ComputerPlayer(algorithm).get_path(check_game.root, True)[1]):
+                failed += 1
+                print(f"{str_red} {algorithm}, time limit {time_limit}: cancelled {cancelled} "
+                      f"after {elapsed:.2f} seconds {str_reset}")
+    if not failed:
+        print(f"{str_green} Search cancellation test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_17_pondering(sequence_length=14, games=3, seed=17):
+    """
+    Plays games of a computer player against random moves, pondering on every random player's turn. Every reply to
+    a pondered move must be answered from pondering with the score of a new player's search. In the last game the
+    opponent plays the replies the player expected, which must have been pondered first.
+    """
+    print("Pondering test")
+    rng = random.Random(seed)
+    failed = 0
+    for algorithm in ("minimax", "alpha_beta", "pvs", "mtdf", "backward_induction"):
+        for game_index in range(games):
+            sequence = "".join(rng.choice("01") for _ in range(sequence_length))
+            game = GameTree(sequence, game_index != 1, 4)
+            player = ComputerPlayer(algorithm)
+            while game.current_state.children:
+                if game.get_current_player() == 1:
+                    path, _ = player.get_path(game.current_state, True)
+                    game.move_to_next_state_by_child(path[1])
+                    continue
+                stats = player.stats
+                pondered = player.ponder(game)
+                if player.stats is not stats:
+                    failed += 1
+                    print(f"{str_red} {algorithm}, {sequence}, move {game.current_depth}: pondering replaced "
+                          f"the statistics {str_reset}")
+                    break
+                if game_index == games - 1:
+                    game.move_to_next_state_by_child(path[2])
+                    state = game.current_state
+                    if (state.children and next(iter(player._pondered)) !=
+                            player._get_entry_key(state, player._get_search_depth(state), True)):
+                        failed += 1
+                        print(f"{str_red} {algorithm}, {sequence}, move {game.current_depth}: expected reply "
+                              f"not pondered first {str_reset}")
+                        break
+                else:
+                    game.move_to_next_state_by_child(rng.choice(game.current_state.children))
+                if not game.current_state.children:
+                    break
+                _, score = player.get_path(game.current_state, True)
+                _, expected_score = ComputerPlayer(algorithm).get_path(game.current_state, True)
+                if not player.stats.pondered or score != expected_score or not pondered:
+                    failed += 1
+                    print(f"{str_red} {algorithm}, {sequence}, move {game.current_depth}: pondered "
+                          f"{player.stats.pondered}, score {score}, expected {expected_score} {str_reset}")
+                    break
+    cancel_event = threading.Event()
+    cancel_event.set()
+    if ComputerPlayer("alpha_beta").ponder(GameTree("0110100111010011", True, 5), cancel_event):
+        failed += 1
+        print(f"{str_red} Cancelled pondering searched anyway {str_reset}")
+    if not failed:
+        print(f"{str_green} Pondering test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_18_tournament(games=2, min_length=8, max_length=12):
+    """Plays small tournaments, including an engine against itself, and checks the summaries add up."""
+    print("Tournament test")
+    failed = 0
+    for engines in (["minimax", "alpha_beta:4", "heuristic"], ["pvs"]):
+        results = tournament.run_tournament([tournament.parse_engine(engine) for engine in engines], games,
+                                            min_length=min_length, max_length=max_length)
+        summary = results["summary"]
+        pairing_count = max(1, len(engines) * (len(engines) - 1) // 2)
+        problems = [problem for problem, found in (
+            ("game count", len(results["records"]) != 2 * games * pairing_count),
+            ("pairings", any(pairing["wins"] + pairing["draws"] + pairing["losses"] != pairing["games"]
+                             for pairing in summary["pairings"].values())),
+            ("points", sum(engine["points"] for engine in summary["engines"].values()) != len(results["records"])),
+            ("moves", any(len(record["moves"]) != len(record["sequence"]) - 1 for record in results["records"])),
+            ("winner", any((record["winner"] == 1) != (record["score"][0] > record["score"][1])
+                           for record in results["records"]))) if found]
+        if problems:
+            failed += 1
+            print(f"{str_red} {engines}: {', '.join(problems)} {str_reset}")
+    if not failed:
+        print(f"{str_green} Tournament test - Passed {str_reset}")
+    assert failed == 0
+
+
+def test_19_time_limited_game(sequence="0110100111010011", depth_limit=6, time_limit=5):
+    """
+    Plays whole games with one time-limited player per algorithm, so later moves are searched with a transposition
+    table kept from earlier moves. Every move must score like a new player's search.
+    """
+    print("Time-limited game test")
+    failed = 0
+    for algorithm in ("minimax", "alpha_beta", "pvs", "mtdf", "backward_induction"):
+        game = GameTree(sequence, False, depth_limit)
+        player = ComputerPlayer(algorithm, time_limit=time_limit)
+        while game.current_state.children:
+            is_maximizing = game.get_current_player() == 1
+            path, score = player.get_path(game.current_state, is_maximizing)
+            _, expected_score = ComputerPlayer(algorithm).get_path(game.current_state, is_maximizing)
+            if score != expected_score:
+                failed += 1
+                print(f"{str_red} {algorithm}, move {game.current_depth}: score {score}, "
+                      f"expected {expected_score} {str_reset}")
+                break
+            game.move_to_next_state_by_child(path[1])
+    if not failed:
+        print(f"{str_green} Time-limited game test - Passed {str_reset}")
+    assert failed == 0
+
+
 
 # test_1_path_result_consistency(5, 9)
 test_2_minimax_vs_alpha_beta_play("000000101111010", 15)
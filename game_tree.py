@@ -1,8 +1,16 @@
 import random
-import sys
 import math
+import time
 
+from array import array
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    # Only the vectorized builder needs NumPy
+    np = None
 
 str_blue = "\033[34m"
 str_red = "\033[31m"
@@ -10,61 +18,372 @@ str_green = "\033[32m"
 str_yellow = "\033[33m"
 str_reset = "\033[0m"
 
+class BuildCancelled(Exception):
+    """Raised by a tree build when the tree's cancel_event is set. The tree is left half built and must be dropped."""
+
+
+class NodePool:
+    """
+    Struct-of-arrays storage of game tree nodes. A node is a row index into the typed columns
+    below, so it costs a few bytes instead of a Python object with a __dict__, a str and a list.
+    """
+    bits: array
+    """Encoded sequence of each node (see GameState.bits)."""
+    length: array
+    """Sequence length of each node."""
+    score_player1: array
+    """Score of player 1 in each node."""
+    score_player2: array
+    """Score of player 2 in each node."""
+    pattern_weight: array
+    """Weighted count of the 3-digit patterns of each node's sequence (see GameTree._pattern_weights)."""
+    equal_pairs: array
+    """Number of adjacent equal digits ("00" or "11") in each node's sequence."""
+    child_offset: array
+    """Position of the first child of each node in 'child_index'."""
+    child_count: array
+    """Number of children of each node, 0 for leaves and nodes that were not expanded yet."""
+    child_index: array
+    """Child lists of all nodes stored back to back, as edges: (child index << 1) | flip,
+    where flip means the child is stored as the complement of the sequence the move produces."""
+    expander: object
+    """Optional callback generating the children of a node index on first access (lazy trees)."""
+
+    max_length = 64
+    """Longest sequence that fits into the 'bits' column."""
+
+    def __init__(self):
+        self.bits = array('Q')
+        self.length = array('B')
+        self.score_player1 = array('b')
+        self.score_player2 = array('b')
+        self.pattern_weight = array('b')
+        self.equal_pairs = array('B')
+        self.child_offset = array('I')
+        self.child_count = array('B')
+        self.child_index = array('I')
+        self.expander = None
+
+    def __len__(self):
+        return len(self.bits)
+
+    @property
+    def row_size(self) -> int:
+        """Bytes used by one node in the per-node columns."""
+        return (self.bits.itemsize + self.length.itemsize + self.score_player1.itemsize
+                + self.score_player2.itemsize + self.pattern_weight.itemsize + self.equal_pairs.itemsize
+                + self.child_offset.itemsize + self.child_count.itemsize)
+
+    def add(self, bits: int, length: int, score_player1: int, score_player2: int, patterns: tuple = None) -> int:
+        """
+        Appends a node without children and returns its index.
+        'patterns' is the (pattern_weight, equal_pairs) pair of the sequence, counted here when not given.
+        """
+        if length > NodePool.max_length:
+            raise ValueError(f"Sequences longer than {NodePool.max_length} digits are not supported.")
+        if patterns is None:
+            patterns = GameTree._count_patterns(bits, length)
+        self.bits.append(bits)
+        self.length.append(length)
+        self.score_player1.append(score_player1)
+        self.score_player2.append(score_player2)
+        self.pattern_weight.append(patterns[0])
+        self.equal_pairs.append(patterns[1])
+        self.child_offset.append(0)
+        self.child_count.append(0)
+        return len(self.bits) - 1
+
+    def get_children(self, index: int) -> array:
+        """Returns the child edges of the node at 'index'."""
+        offset = self.child_offset[index]
+        return self.child_index[offset:offset + self.child_count[index]]
+
+    def set_children(self, index: int, children: list):
+        """Replaces the child edges of the node at 'index', reusing its slot when the new list fits."""
+        count = len(children)
+        if count > self.child_count[index]:
+            self.child_offset[index] = len(self.child_index)
+            self.child_index.extend(children)
+        else:
+            offset = self.child_offset[index]
+            for i, child in enumerate(children):
+                self.child_index[offset + i] = child
+        self.child_count[index] = count
+
+    def get_size(self) -> int:
+        """Bytes used by all columns of the pool."""
+        return sum(column.buffer_info()[1] * column.itemsize
+                   for column in (self.bits, self.length, self.score_player1, self.score_player2,
+                                  self.pattern_weight, self.equal_pairs,
+                                  self.child_offset, self.child_count, self.child_index))
+
+    def compact(self, roots: list) -> tuple:
+        """
+        Copies the nodes reachable from 'roots' into a new pool, dropping everything else.
+        Returns (new_pool, mapping) where mapping translates old node indices to new ones.
+        """
+        mapping = {}
+        order = []
+        for root in roots:
+            if root not in mapping:
+                mapping[root] = len(order)
+                order.append(root)
+        position = 0
+        while position < len(order):
+            for edge in self.get_children(order[position]):
+                child = edge >> 1
+                if child not in mapping:
+                    mapping[child] = len(order)
+                    order.append(child)
+            position += 1
+
+        new_pool = NodePool()
+        for index in order:
+            new_pool.add(self.bits[index], self.length[index], self.score_player1[index], self.score_player2[index],
+                         (self.pattern_weight[index], self.equal_pairs[index]))
+        for index in order:
+            if self.child_count[index]:
+                new_pool.set_children(mapping[index], [(mapping[edge >> 1] << 1) | (edge & 1)
+                                                       for edge in self.get_children(index)])
+        return new_pool, mapping
+
+
+def _expand_shard(task: tuple) -> tuple:
+    """
+    Generates the children of one shard of a layer in a worker process (see GameTree._build_layer_sharded).
+    The parents arrive as column bytes and are loaded into a pool of their own, where the children are created and
+    unified by GameTree._add_children exactly as in a serial build.
+    Returns (keys, child_columns, child_counts, child_edges): the packed keys of the unique children in creation order,
+    their bits, score and pattern columns as bytes, and the number and edges of the children of every parent,
+    with child indices local to the shard pool.
+    """
+    length, is_player1, mask, parent_columns = task
+    pool = NodePool()
+    columns = (pool.bits, pool.score_player1, pool.score_player2, pool.pattern_weight, pool.equal_pairs)
+    for column, data in zip(columns, parent_columns):
+        column.frombytes(data)
+    parent_count = len(pool.bits)
+    pool.length.frombytes(bytes([length]) * parent_count)
+    pool.child_offset.frombytes(bytes(pool.child_offset.itemsize * parent_count))
+    pool.child_count.frombytes(bytes(parent_count))
+    layer_dict = {}
+    for parent in range(parent_count):
+        GameTree._add_children(pool, parent, is_player1, mask, layer_dict)
+    return (list(layer_dict), tuple(column[parent_count:].tobytes() for column in columns),
+            pool.child_count.tobytes(), pool.child_index.tobytes())
+
+
 class GameState:
-    sequence: str
-    """Sequence of '0' and '1' representing the current state."""
-    score_player1: int
-    """Score of player 1."""
-    score_player2: int
-    """Score of player 2."""
-    children: list
-    """List of subsequent states."""
+    """Lightweight handle to a single node stored in a NodePool."""
+    __slots__ = ("pool", "index", "flipped")
+    pool: NodePool
+    """Pool that stores the node."""
+    index: int
+    """Row of the node in the pool."""
+    flipped: int
+    """1 if the state is the bitwise complement of the stored sequence, otherwise 0."""
     
-    def __init__(self, sequence : str, score_player1 : int, score_player2 : int):
-        self.sequence = sequence
-        self.score_player1 = score_player1
-        self.score_player2 = score_player2
-        self.children = []
+    def __init__(self, sequence : str, score_player1 : int, score_player2 : int, pool : NodePool = None):
+        bits, length = GameState.encode_sequence(sequence)
+        self.pool = pool if pool is not None else NodePool()
+        self.index = self.pool.add(bits, length, score_player1, score_player2)
+        self.flipped = 0
+
+    @classmethod
+    def from_bits(cls, bits: int, length: int, score_player1: int, score_player2: int,
+                  pool: NodePool = None) -> "GameState":
+        """Creates a state directly from its integer encoding, skipping string parsing."""
+        pool = pool if pool is not None else NodePool()
+        return cls._view(pool, pool.add(bits, length, score_player1, score_player2))
+
+    @classmethod
+    def _view(cls, pool: NodePool, index: int, flipped: int = 0) -> "GameState":
+        """Returns a handle to an existing node of the pool."""
+        state = cls.__new__(cls)
+        state.pool = pool
+        state.index = index
+        state.flipped = flipped
+        return state
+
+    @property
+    def bits(self) -> int:
+        """Sequence encoded as an integer, the first digit being the most significant bit."""
+        bits = self.pool.bits[self.index]
+        if self.flipped:
+            return bits ^ ((1 << self.pool.length[self.index]) - 1)
+        return bits
+
+    @property
+    def length(self) -> int:
+        """Number of digits in the sequence (keeps leading zeros of 'bits')."""
+        return self.pool.length[self.index]
+
+    @property
+    def score_player1(self) -> int:
+        """Score of player 1."""
+        return self.pool.score_player1[self.index]
+
+    @property
+    def score_player2(self) -> int:
+        """Score of player 2."""
+        return self.pool.score_player2[self.index]
+
+    @property
+    def pattern_score(self) -> int:
+        """
+        Sequence-only part of the heuristic: weighted counts of 3-digit patterns, minus one for a lone equal pair.
+        Both counts are the same for a sequence and its complement.
+        """
+        pool = self.pool
+        return pool.pattern_weight[self.index] - (pool.equal_pairs[self.index] == 1)
+
+    @property
+    def children(self) -> list:
+        """List of subsequent states. In a lazy tree they are generated on first access."""
+        pool = self.pool
+        if pool.expander is not None and not pool.child_count[self.index]:
+            pool.expander(self.index)
+        flipped = self.flipped
+        return [GameState._view(pool, edge >> 1, flipped ^ (edge & 1)) for edge in pool.get_children(self.index)]
+
+    @children.setter
+    def children(self, children: list):
+        if any(child.pool is not self.pool for child in children):
+            raise ValueError("Children must be stored in the same pool as their parent.")
+        self.pool.set_children(self.index, [(child.index << 1) | (child.flipped ^ self.flipped)
+                                            for child in children])
+
+    @property
+    def sequence(self) -> str:
+        """Sequence of '0' and '1' representing the current state."""
+        return GameState.decode_sequence(self.bits, self.length)
+
+    @property
+    def key(self) -> int:
+        """Single integer identifying the sequence: 'bits' with a sentinel bit above the first digit."""
+        return (1 << self.length) | self.bits
+
+    @property
+    def canonical_key(self) -> int:
+        """Like 'key', but identical for a sequence and its complement, which have the same game value."""
+        length = self.length
+        bits = self.pool.bits[self.index]
+        return (1 << length) | min(bits, bits ^ ((1 << length) - 1))
+
+    def __eq__(self, other):
+        return (isinstance(other, GameState) and self.pool is other.pool
+                and self.index == other.index and self.flipped == other.flipped)
+
+    def __hash__(self):
+        return hash((id(self.pool), self.index, self.flipped))
 
     def __repr__(self):
         return (f"Seq: {self.sequence} | "
                 f"Score (P1:P2): {self.score_player1}:{self.score_player2} | ")
+
+    @staticmethod
+    def encode_sequence(sequence: str) -> tuple:
+        """Converts a string of '0's and '1's to a (bits, length) pair."""
+        return (int(sequence, 2) if sequence else 0), len(sequence)
+
+    @staticmethod
+    def decode_sequence(bits: int, length: int) -> str:
+        """Converts a (bits, length) pair back to a string of '0's and '1's."""
+        return format(bits, f"0{length}b") if length else ""
     
     @staticmethod
     def get_size(node) -> int:
-        """Estimates the size of a single node in bytes."""
-        return (sys.getsizeof(node) 
-                + sys.getsizeof(node.sequence) 
-                + sys.getsizeof(node.children) 
-                + sys.getsizeof(node.score_player1) 
-                + sys.getsizeof(node.score_player2))
+        """Estimates the size of a single node in bytes: its pool row plus its child references."""
+        pool = node.pool
+        return pool.row_size + pool.child_index.itemsize * pool.child_count[node.index]
 
 
 class GameTree:
     initial_sequence: str
     """Randomly generated initial sequence of '0' and '1' representing the starting state."""
+    pool: NodePool
+    """Storage of all nodes of the tree."""
     root: GameState
     """Pointer to the root node of the game tree."""
     current_state: GameState
     """Pointer to the current state in the game tree."""
     current_depth: int
     """Current move number (depth of the tree) in the game."""
+    canonicalize: bool
+    """Store a sequence and its complement with equal scores as one node (they have the same game value)."""
+    tablebase_length: int
+    """Sequences this short are answered by an endgame tablebase, so only the current state is expanded among them."""
+    lazy: bool
+    """Generate the children of a node when they are first accessed instead of building all layers up front."""
+    vectorized: bool
+    """Build each layer with NumPy array operations over all parents and moves at once (needs NumPy, eager trees only)."""
+    first_player: int
+    """Player (1 or 2) who makes the first move from the initial sequence."""
+    workers: int
+    """Number of processes that generate the children of large layers, each for one shard of the layer."""
+    node_budget: int
+    """Most nodes the pool may hold, or None. Layers that would exceed it are not built (eager trees only)."""
+    memory_budget: int
+    """Most bytes the pool columns may use, or None. Layers that would exceed it are not built (eager trees only)."""
+    time_budget: float
+    """Most seconds a single build may take, or None. Layers that would exceed it are not built (eager trees only)."""
+    cancel_event: object
+    """
+    Optional threading.Event another thread sets to stop a build with BuildCancelled.
+    Checked for every parent, or for every layer of the vectorized and sharded builders.
+    """
+
+    parallel_layer_size = 4096
+    """Smallest layer that is split into shards for the worker processes, smaller ones are built in this process."""
     
-    def __init__(self, sequence, dynamic_depth: bool = True, depth_limit: int = 5):
+    def __init__(self, sequence, dynamic_depth: bool = True, depth_limit: int = 5, canonicalize: bool = True,
+                 tablebase_length: int = 0, lazy: bool = False, vectorized: bool = False, first_player: int = 1,
+                 workers: int = 1, node_budget: int = None, memory_budget: int = None, time_budget: float = None,
+                 cancel_event=None):
         if isinstance(sequence, int) and sequence > 0:
             self.initial_sequence = GameTree._generate_random_sequence(sequence)
         elif isinstance(sequence, str) and all(c in '01' for c in sequence):
             self.initial_sequence = sequence
         else:
             raise ValueError("Invalid sequence provided. Must be a integer length or string of '0's and '1's.")
+        self.pool = NodePool()
         self.root = GameState(
-            self.initial_sequence, score_player1=0, score_player2=0
+            self.initial_sequence, score_player1=0, score_player2=0, pool=self.pool
         )
         self.dynamic_depth = dynamic_depth
+        self.canonicalize = canonicalize
+        self.tablebase_length = tablebase_length
+        self.lazy = lazy
+        if vectorized and np is None:
+            raise ValueError("Vectorized tree building requires NumPy.")
+        self.vectorized = vectorized
+        if first_player not in (1, 2):
+            raise ValueError("First player must be 1 or 2.")
+        self.first_player = first_player
+        if workers < 1:
+            raise ValueError("Number of workers must be positive.")
+        self.workers = workers
+        if lazy and (node_budget, memory_budget, time_budget) != (None, None, None):
+            raise ValueError("Build budgets require an eager tree.")
+        self.node_budget = node_budget
+        self.memory_budget = memory_budget
+        self.time_budget = time_budget
+        self.cancel_event = cancel_event
+        # Unique children per (parent, move) pair of the layers built so far, by parent length
+        self._unique_ratios = {}
+        self._seconds_per_node = 0.0
+        self._executor = None
+        self._layer_dicts = {}
+        if lazy:
+            self.pool.expander = self._expand_node
         self.current_state = self.root
         self.depth_limit = depth_limit
+        self._requested_depth_limit = depth_limit
         self.current_depth = 0
+        self._last_build_depth = -1
+        self._compacted_depth = 0
         self._build_tree()
+        self._compacted_size = len(self.pool)
         
     def __repr__(self):
         return (f"Move #: {self.current_depth} | "
@@ -74,44 +393,65 @@ class GameTree:
 
     def move_to_next_state_by_child(self, child_node : GameState):
         """Advances the game to the next state based on the selected child node.
-        Purges all children nodes that are not needed anymore and generates the next game tree level if needed."""
+        Purges all children nodes that are not needed anymore and generates the next game tree level if needed.
+        Handles to pruned or compacted nodes keep reading the old pool but are no longer part of the tree."""
         if child_node not in self.current_state.children:
             raise ValueError("Given node is not a child of the current state.")
         self.current_state.children = [child_node]
         self.current_state = child_node
         self.current_depth += 1
+        if len(self.pool) > 2 * self._compacted_size:
+            self._compact_pool()
         self._build_tree()
     
     def move_to_next_state_by_move(self, first_digit_to_join: int):
         """
         Advances the game by merging the pair at 'first_digit_to_join'.
         """
-        new_state = self._create_child(
-            parent_node=self.current_state, 
-            first_digit_to_join=first_digit_to_join, 
-            depth=self.current_depth
-        )
-        
-        for child in self.current_state.children:
-            if child.sequence == new_state.sequence:
-                new_state = child
-                break
-        
+        if not (0 <= first_digit_to_join < self.current_state.length - 1):
+            raise ValueError(f"Invalid index {first_digit_to_join} for sequence {self.current_state.sequence}")
+        new_state = GameTree._find_child(self.current_state, first_digit_to_join)
+        if new_state is None:
+            raise ValueError("Given move does not lead to a child of the current state.")
         self.move_to_next_state_by_child(new_state)
         
     def get_current_player(self, at_depth=None) -> int:
         """Returns the current player (1 or 2)."""
         if at_depth is None:
             at_depth = self.current_depth
-        return 1 if at_depth % 2 == 0 else 2
+        return 1 if (at_depth + self.first_player - 1) % 2 == 0 else 2
     
-    def _update_depth_limit(self):
-        depth_limit = math.floor(-0.375 * len(self.current_state.sequence)+12.375)
+    @property
+    def is_budgeted(self) -> bool:
+        """True if a node, memory or time budget chooses the depth limit."""
+        return self.node_budget is not None or self.memory_budget is not None or self.time_budget is not None
+
+    def _update_depth_limit(self, length: int = None):
+        """Dynamic depth limit of a build from a state of 'length' digits, by default the current state."""
+        if length is None:
+            length = self.current_state.length
+        if self.is_budgeted:
+            # The budget decides how deep the build goes
+            return length
+        depth_limit = math.floor(-0.375 * length+12.375)
         if depth_limit < 3:
             return 3
-        elif depth_limit > len(self.current_state.sequence):
-            return len(self.current_state.sequence)
+        elif depth_limit > length:
+            return length
         return depth_limit
+
+    def get_depth_after_move(self) -> int:
+        """
+        Depth limit the tree will have below the next state once a move is made: the layers kept from the current
+        build, or more if the build after the move goes deeper (see _build_tree). Budgeted builds may go deeper,
+        only their kept layers are counted.
+        """
+        kept = self._last_build_depth - self.current_depth - 1
+        if self.is_budgeted:
+            return kept
+        if self.dynamic_depth:
+            return max(kept, self._update_depth_limit(self.current_state.length - 1))
+        return max(kept, self._requested_depth_limit)
         
             
     
@@ -121,112 +461,537 @@ class GameTree:
         Build the game tree up to self.depth_limit layers, unifying duplicate children
         across each layer (i.e., if two parents at the same layer generate an identical
         (sequence, score_p1, score_p2) child, they will reference the same child node).
+        Works on pool indices only, so duplicates are never allocated in the first place.
+        After a move the build continues from the stored frontier of the previous build.
+        With a budget the build stops before a layer that is estimated to exceed it, and the depth limit is lowered
+        to the layers actually built (see _exceeds_budget). The layer below the current state is always built.
         """
         if self.dynamic_depth:
             self.depth_limit = self._update_depth_limit()
+        else:
+            self.depth_limit = self._requested_depth_limit
+        if self.lazy:
+            print(f"Lazy tree, depth limit {self.depth_limit}...")
+            # Layers above the current state can no longer get new nodes
+            for depth in [depth for depth in self._layer_dicts if depth <= self.current_depth]:
+                del self._layer_dicts[depth]
+            self._last_build_layer = array('I')
+            self._last_build_depth = self.current_depth
+            return
         print(f"Building tree, depth limit {self.depth_limit}...")
-        current_layer = [self.current_state]
-        parent_layer_depth = self.current_depth
+        build_start = time.perf_counter()
+        pool = self.pool
+        if self._last_build_depth >= self.current_depth:
+            # Continue from the stored frontier, only the new bottom layers are generated
+            current_layer = self._get_retained_frontier()
+            parent_layer_depth = self._last_build_depth
+        else:
+            current_layer = array('I', [self.current_state.index])
+            parent_layer_depth = self.current_depth
             
         while parent_layer_depth < (self.current_depth + self.depth_limit):
-            parents_and_children = []
+            self._check_cancelled()
+            # Positions answered by the tablebase are not expanded, except the current state
+            if (parent_layer_depth > self.current_depth and current_layer
+                    and pool.length[current_layer[0]] <= self.tablebase_length):
+                break
+            if (self.is_budgeted and current_layer and parent_layer_depth > self.current_depth
+                    and self._exceeds_budget(current_layer, time.perf_counter() - build_start)):
+                if self.current_depth > self._compacted_depth:
+                    # Pruned subtrees still count against the budget, drop them and estimate again
+                    mapping = self._compact_pool()
+                    pool = self.pool
+                    current_layer = array('I', (mapping[node] for node in current_layer))
+                if self._exceeds_budget(current_layer, time.perf_counter() - build_start):
+                    self.depth_limit = parent_layer_depth - self.current_depth
+                    print(f"Budget reached, depth limit lowered to {self.depth_limit}")
+                    break
+
+            layer_start = time.perf_counter()
+            pool_size = len(pool)
+            next_layer = None
+            if self.workers > 1 and self._can_shard_layer(current_layer):
+                next_layer = self._build_layer_sharded(current_layer, parent_layer_depth)
+            elif self.vectorized and self._can_vectorize_layer(current_layer):
+                next_layer = self._build_layer_vectorized(current_layer, parent_layer_depth)
+            if next_layer is not None:
+                if not next_layer:
+                    break
+                self._measure_layer(current_layer, next_layer, len(pool) - pool_size, layer_start)
+                current_layer = next_layer
+                parent_layer_depth += 1
+                continue
 
-            # 1) Generate children for each node in the current layer (if needed)
+            # Maps packed (bits, score_p1, score_p2) keys to the canonical node of the next layer.
+            # All nodes of a layer have the same length, so 'bits' alone identifies the sequence.
+            layer_dict = {}
+
+            cancel_event = self.cancel_event
             for node in current_layer:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise BuildCancelled()
                 # Only generate if node has length > 1 and hasn't generated children yet
-                if len(node.sequence) > 1 and not node.children:
-                    node.children = self._populate_children(node, parent_layer_depth)
-
-                # Keep track of (parent, [children]) to unify references
-                parents_and_children.append((node, node.children))
-
-            # 2) Unify duplicate children across the entire layer
-            layer_dict = {}  # maps (sequence, score_p1, score_p2) -> canonical GameState
-            for parent, child_list in parents_and_children:
-                for i, child in enumerate(child_list):
-                    key = (child.sequence, child.score_player1, child.score_player2)
-                    if key not in layer_dict:
-                        layer_dict[key] = child  # first time we see this child
-                    else:
-                        # Duplicate => replace the parent's child reference
-                        parent.children[i] = layer_dict[key]
+                if pool.length[node] > 1 and not pool.child_count[node]:
+                    self._populate_children(node, parent_layer_depth, layer_dict)
+                else:
+                    # Children kept from a previous build are already unique, just register them
+                    for edge in pool.get_children(node):
+                        child = edge >> 1
+                        layer_dict.setdefault(self._pack_key(child), child)
 
-            # 3) Prepare the next layer
             # All unique children are taken from layer_dict
-            next_layer = list(layer_dict.values())
+            next_layer = array('I', layer_dict.values())
             if not next_layer:
                 break
+            self._measure_layer(current_layer, next_layer, len(pool) - pool_size, layer_start)
 
             current_layer = next_layer
             parent_layer_depth += 1
             
         self._last_build_layer = current_layer
         self._last_build_depth = parent_layer_depth
-              
-    def _create_child(self, parent_node: GameState, first_digit_to_join: int, depth: int) -> GameState:
-        """
-        Helper to produce a single child node by merging the two adjacent bits
-        in parent_node.sequence starting at 'first_digit_to_join'.
-        """
-        seq = parent_node.sequence
-
-        # Safety check for index
-        if not (0 <= first_digit_to_join < len(seq) - 1):
-            raise ValueError(f"Invalid index {first_digit_to_join} for sequence {seq}")
-
-        # Determine the pair
-        pair = (seq[first_digit_to_join], seq[first_digit_to_join + 1])
-
-        #make it a separate function so i can use it in the main file
-        # Determine new digit & score change 
-        if pair == ('0', '0'):
-            new_digit = '1'
-            score_change = +1
-        elif pair == ('0', '1'):
-            new_digit = '0'
-            score_change = -1
-        elif pair == ('1', '0'):
-            new_digit = '1'
-            score_change = -1
-        elif pair == ('1', '1'):
-            new_digit = '0'
-            score_change = +1
-
-        # Construct new sequence
-        new_sequence = seq[:first_digit_to_join] + new_digit + seq[first_digit_to_join + 2:]
-        # Update scores
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise BuildCancelled()
+
+    def _measure_layer(self, layer: array, next_layer: array, created: int, start_time: float):
+        """Records the share of unique children and, if nodes were created, the build time per node of a new layer."""
+        length = self.pool.length[layer[0]]
+        self._unique_ratios[length] = len(next_layer) / (len(layer) * (length - 1))
+        if created:
+            self._seconds_per_node = (time.perf_counter() - start_time) / created
+
+    def _exceeds_budget(self, layer: array, elapsed: float) -> bool:
+        """
+        Checks whether building the next layer of 'layer' is estimated to exceed a budget, 'elapsed' seconds into
+        the build. The layer gets one child per parent and move, times the unique share measured for parents of
+        the same length, or else for the shortest parents measured so far. Deeper layers unify more children,
+        so the estimate errs on the large side. Its memory is a pool row per node and an edge per move.
+        """
+        pool = self.pool
+        length = pool.length[layer[0]]
+        moves = len(layer) * (length - 1)
+        ratios = self._unique_ratios
+        nodes = moves * ratios.get(length, ratios[min(ratios)] if ratios else 1.0)
+        if self.node_budget is not None and len(pool) + nodes > self.node_budget:
+            return True
+        if (self.memory_budget is not None and pool.get_size() + nodes * pool.row_size
+                + moves * pool.child_index.itemsize > self.memory_budget):
+            return True
+        return self.time_budget is not None and elapsed + nodes * self._seconds_per_node > self.time_budget
+
+    def close(self):
+        """Stops the worker processes of the sharded build, they are started again when needed."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _can_shard_layer(self, layer: array) -> bool:
+        """Checks whether 'layer' is large enough to be built by the worker processes and has no children yet."""
+        pool = self.pool
+        if len(layer) < GameTree.parallel_layer_size:
+            return False
+        return not any(pool.child_count[node] for node in layer)
+
+    def _build_layer_sharded(self, layer: array, depth: int) -> array:
+        """
+        Generates the next layer with self.workers processes and returns it. The nodes of 'layer' are sharded by
+        a hash of their packed key (see _split_layer), each worker creates and unifies the children of its shard
+        (see _expand_shard).
+        The shards' children are then merged into the pool with duplicates across shards unified on their keys,
+        and the edges of every parent are translated to the merged nodes, keeping their move order.
+        """
+        pool = self.pool
+        length = pool.length[layer[0]]
+        if length <= 1:
+            return array('I')
+        shards = [shard for shard in self._split_layer(layer) if shard]
+        mask = ((1 << (length - 1)) - 1) if self.canonicalize else 0
+        is_player1 = self.get_current_player(depth) == 1
+        columns = (pool.bits, pool.score_player1, pool.score_player2, pool.pattern_weight, pool.equal_pairs)
+        tasks = [(length, is_player1, mask, tuple(array(column.typecode, [column[node] for node in shard]).tobytes()
+                                                  for column in columns))
+                 for shard in shards]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+
+        layer_dict = {}
+        for shard, (keys, child_columns, child_counts, child_edges) in zip(shards, self._executor.map(_expand_shard,
+                                                                                                     tasks)):
+            bits, score_p1, score_p2, pattern_weight, equal_pairs = (array(column.typecode, data)
+                                                                     for column, data in zip(columns, child_columns))
+            # Children new to the layer are appended in bulk, column by column
+            mapping = []
+            new_children = []
+            next_child = len(pool)
+            for i, key in enumerate(keys):
+                child = layer_dict.get(key)
+                if child is None:
+                    child = layer_dict[key] = next_child
+                    next_child += 1
+                    new_children.append(i)
+                mapping.append(child)
+            for column, values in zip(columns, (bits, score_p1, score_p2, pattern_weight, equal_pairs)):
+                column.extend(values if len(new_children) == len(keys) else [values[i] for i in new_children])
+            pool.length.frombytes(bytes([length - 1]) * len(new_children))
+            pool.child_offset.frombytes(bytes(pool.child_offset.itemsize * len(new_children)))
+            pool.child_count.frombytes(bytes(len(new_children)))
+
+            # Parents had no children, so their edges go to the end of the edge column in shard order
+            first_child = len(shard)
+            offset = len(pool.child_index)
+            pool.child_index.extend([(mapping[(edge >> 1) - first_child] << 1) | (edge & 1)
+                                     for edge in array('I', child_edges)])
+            for parent, count in zip(shard, child_counts):
+                pool.child_offset[parent] = offset
+                pool.child_count[parent] = count
+                offset += count
+        return array('I', layer_dict.values())
+
+    def _split_layer(self, layer: array) -> list:
+        """
+        Splits 'layer' into self.workers shards by a multiplicative hash of the packed keys. The keys themselves
+        are no good shard numbers: their low byte is player 2's score, which has the same parity on a whole layer.
+        """
+        workers = self.workers
+        shards = [array('I') for _ in range(workers)]
+        for node in layer:
+            shards[(((self._pack_key(node) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % workers].append(node)
+        return shards
+
+    def _can_vectorize_layer(self, layer: array) -> bool:
+        """
+        Checks whether the vectorized builder can expand 'layer': its packed child keys must fit into 64 bits
+        and no node may have children yet (children kept from a previous build are registered by the loop).
+        """
+        pool = self.pool
+        if not layer or pool.length[layer[0]] - 1 > 48:
+            return False
+        return not any(pool.child_count[node] for node in layer)
+
+    def _build_layer_vectorized(self, layer: array, depth: int) -> array:
+        """
+        Generates the next layer for all nodes of 'layer' at once and returns it.
+        Every (parent, move) pair is computed as one element of NumPy arrays, children are unified with np.unique
+        on the packed (bits, score_p1, score_p2) keys, and nodes and edges are appended to the pool in the same order
+        the per-node loop of _build_tree creates them, so both builders produce identical pools.
+        """
+        pool = self.pool
+        length = pool.length[layer[0]]
+        if length <= 1:
+            return array('I')
+        parents = np.frombuffer(layer, dtype=np.uint32).astype(np.intp)
+        bits = np.frombuffer(pool.bits, dtype=np.uint64)[parents][:, None]
+        score_p1 = np.frombuffer(pool.score_player1, dtype=np.int8)[parents][:, None]
+        score_p2 = np.frombuffer(pool.score_player2, dtype=np.int8)[parents][:, None]
+        pattern_weight = np.frombuffer(pool.pattern_weight, dtype=np.int8)[parents][:, None]
+        equal_pairs = np.frombuffer(pool.equal_pairs, dtype=np.uint8)[parents][:, None]
+
+        # One column per move, see _generate_moves and _update_patterns
+        moves = np.arange(length - 1)
+        low = (length - 2 - moves).astype(np.uint64)
+        new_bits = ((bits >> (low + 2)) << (low + 1)) | ((bits & ((np.uint64(1) << (low + 1)) - 1)) ^ (np.uint64(1) << low))
+        score_change = 1 - 2 * (((bits ^ (bits >> 1)) >> low) & 1).astype(np.int8)
+        left = np.minimum(moves, 2)
+        right = np.minimum(length - 2 - moves, 2)
+        segment = (bits >> (low - right.astype(np.uint64))) & ((np.uint64(1) << (left + 2 + right).astype(np.uint64)) - 1)
+        delta_weight, delta_pairs = GameTree._get_pattern_delta_arrays()
+        delta_index = ((left * 3 + right) << 6).astype(np.uint64) | segment
+        new_weight = (pattern_weight + delta_weight[delta_index]).ravel()
+        new_pairs = (equal_pairs + delta_pairs[delta_index]).ravel()
         if self.get_current_player(depth) == 1:
-            new_score_p1 = parent_node.score_player1 + score_change
-            new_score_p2 = parent_node.score_player2
+            new_score_p1, new_score_p2 = score_p1 + score_change, np.broadcast_to(score_p2, score_change.shape)
         else:
-            new_score_p1 = parent_node.score_player1
-            new_score_p2 = parent_node.score_player2 + score_change
-        
-        if abs(score_change) > 1:
-            raise ValueError(f"Invalid score change: {score_change}, parent state: {parent_node}")
-        
-        # Create the new child node
-        return GameState(
-            sequence=new_sequence,
-            score_player1=new_score_p1,
-            score_player2=new_score_p2
-        )
+            new_score_p1, new_score_p2 = np.broadcast_to(score_p1, score_change.shape), score_p2 + score_change
+        new_score_p1 = new_score_p1.ravel()
+        new_score_p2 = new_score_p2.ravel()
+        new_bits = new_bits.ravel()
+        mask = np.uint64((1 << (length - 1)) - 1 if self.canonicalize else 0)
+        stored_bits = np.minimum(new_bits, new_bits ^ mask)
+        keys = ((stored_bits << np.uint64(16)) | (new_score_p1.astype(np.uint8).astype(np.uint64) << np.uint64(8))
+                | new_score_p2.astype(np.uint8).astype(np.uint64))
+
+        # Unique children numbered by first occurrence, like the insertion order of the loop's layer_dict
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        first = first[order]
+        start = len(pool)
+        pool.bits.frombytes(stored_bits[first].tobytes())
+        pool.length.frombytes(np.full(len(first), length - 1, dtype=np.uint8).tobytes())
+        pool.score_player1.frombytes(new_score_p1[first].astype(np.int8).tobytes())
+        pool.score_player2.frombytes(new_score_p2[first].astype(np.int8).tobytes())
+        pool.pattern_weight.frombytes(new_weight[first].astype(np.int8).tobytes())
+        pool.equal_pairs.frombytes(new_pairs[first].astype(np.uint8).tobytes())
+        pool.child_offset.frombytes(bytes(4 * len(first)))
+        pool.child_count.frombytes(bytes(len(first)))
 
-    def _populate_children(self, parent_node: GameState, depth: int = 0):
+        # Edges of each parent without repeats, in move order
+        edges = ((start + rank[inverse.ravel()]).astype(np.uint64) << np.uint64(1)) | (stored_bits != new_bits)
+        rows = np.repeat(np.arange(len(parents), dtype=np.uint64), length - 1)
+        _, kept = np.unique((rows << np.uint64(33)) | edges, return_index=True)
+        kept.sort()
+        counts = np.bincount(rows[kept].astype(np.intp), minlength=len(parents))
+        offsets = len(pool.child_index) + np.cumsum(counts) - counts
+        pool.child_index.frombytes(edges[kept].astype(np.uint32).tobytes())
+        child_offset = np.frombuffer(pool.child_offset, dtype=np.uint32)
+        child_count = np.frombuffer(pool.child_count, dtype=np.uint8)
+        child_offset[parents] = offsets
+        child_count[parents] = counts
+        # Views pin the columns, they cannot grow while one exists
+        del child_offset, child_count
+        return array('I', range(start, start + len(first)))
+
+    @staticmethod
+    def _get_pattern_delta_arrays() -> tuple:
+        """Returns _pattern_deltas as (delta_weight, delta_pairs) NumPy arrays, converted on first use."""
+        if GameTree._pattern_delta_arrays is None:
+            # Indices of segments longer than their window are never looked up
+            deltas = [delta or (0, 0) for delta in GameTree._pattern_deltas]
+            GameTree._pattern_delta_arrays = tuple(np.array(column, dtype=np.int8) for column in zip(*deltas))
+        return GameTree._pattern_delta_arrays
+
+    def _get_retained_frontier(self) -> array:
+        """
+        Returns the nodes of the last built layer that descend from the current state. Only the stored
+        child edges of the retained layers are followed, no keys are packed and no children generated.
         """
-        Generate all child GameStates, ensuring no duplicates are stored
-        if (sequence, score_player1, score_player2) already exists.
+        pool = self.pool
+        layer = [self.current_state.index]
+        for _ in range(self._last_build_depth - self.current_depth):
+            next_layer = {}
+            for node in layer:
+                for edge in pool.get_children(node):
+                    next_layer[edge >> 1] = None
+            layer = next_layer
+        return array('I', layer)
+
+    def _compact_pool(self) -> dict:
         """
+        Moves the nodes still reachable from the root into a fresh pool, dropping pruned subtrees.
+        Returns the mapping of old node indices to new ones.
+        """
+        pool, mapping = self.pool.compact([self.root.index])
+        self.pool = pool
+        self.root = GameState._view(pool, mapping[self.root.index], self.root.flipped)
+        self.current_state = GameState._view(pool, mapping[self.current_state.index], self.current_state.flipped)
+        self._last_build_layer = array('I', (mapping[node] for node in self._last_build_layer if node in mapping))
+        self._layer_dicts = {depth: {key: mapping[node] for key, node in layer_dict.items() if node in mapping}
+                             for depth, layer_dict in self._layer_dicts.items()}
+        if self.lazy:
+            pool.expander = self._expand_node
+        self._compacted_size = len(pool)
+        self._compacted_depth = self.current_depth
+        return mapping
+
+    def _expand_node(self, node: int):
+        """
+        Generates the children of a pool node on first access in lazy mode, if the node is above the
+        depth limit. Children are unified with all nodes created so far on the same layer.
+        """
+        pool = self.pool
+        length = pool.length[node]
+        depth = len(self.initial_sequence) - length
+        if length <= 1 or depth >= self.current_depth + self.depth_limit:
+            return
+        if depth > self.current_depth and length <= self.tablebase_length:
+            return
+        layer_dict = self._layer_dicts.setdefault(depth + 1, {})
+        self._populate_children(node, depth, layer_dict)
+
+    def get_lazy_stats(self) -> tuple:
+        """
+        Returns (created, eager): nodes materialized below the current state and nodes an eager build
+        would hold there. Walks the pool directly, so counting does not expand anything.
+        """
+        pool = self.pool
+        seen = {self.current_state.index}
+        pending = [self.current_state.index]
+        while pending:
+            for edge in pool.get_children(pending.pop()):
+                if edge >> 1 not in seen:
+                    seen.add(edge >> 1)
+                    pending.append(edge >> 1)
+
+        # Replays the eager layer build on packed keys only
+        layer = {(pool.bits[self.current_state.index], pool.score_player1[self.current_state.index],
+                  pool.score_player2[self.current_state.index])}
+        length = self.current_state.length
+        eager = 1
+        for depth in range(self.current_depth, self.current_depth + self.depth_limit):
+            if length <= 1 or (depth > self.current_depth and length <= self.tablebase_length):
+                break
+            mask = ((1 << (length - 1)) - 1) if self.canonicalize else 0
+            is_player1 = self.get_current_player(depth) == 1
+            next_layer = set()
+            for bits, score_p1, score_p2 in layer:
+                for _, new_bits, score_change in GameTree._generate_moves(bits, length):
+                    if is_player1:
+                        next_layer.add((min(new_bits, new_bits ^ mask), score_p1 + score_change, score_p2))
+                    else:
+                        next_layer.add((min(new_bits, new_bits ^ mask), score_p1, score_p2 + score_change))
+            eager += len(next_layer)
+            layer = next_layer
+            length -= 1
+        return len(seen), eager
+
+    def print_lazy_stats(self):
+        """Prints how many nodes below the current state were never created compared to an eager build."""
+        created, eager = self.get_lazy_stats()
+        print(f"{created:,} of {eager:,} nodes created, {eager - created:,} never created "
+              f"({100 * (eager - created) / eager:.1f}%)")
+
+    def _populate_children(self, parent: int, depth: int = 0, layer_dict: dict = None) -> list:
+        """
+        Generate all children of the pool node 'parent', ensuring no duplicates are stored
+        if (sequence, score_player1, score_player2) already exists among its siblings or in 'layer_dict'.
+        With canonicalization, a child whose complement is already stored is linked through a flipped edge.
+        Returns the list of child edges.
+        """
+        if layer_dict is None:
+            layer_dict = {}
+        mask = ((1 << (self.pool.length[parent] - 1)) - 1) if self.canonicalize else 0
+        return GameTree._add_children(self.pool, parent, self.get_current_player(depth) == 1, mask, layer_dict)
+
+    @staticmethod
+    def _add_children(pool: NodePool, parent: int, is_player1: bool, mask: int, layer_dict: dict) -> list:
+        """
+        Does the work of _populate_children on any pool, also on the shard pools of worker processes.
+        'mask' complements the children's sequences when canonicalizing, otherwise it is 0.
+        """
+        length = pool.length[parent]
+        bits = pool.bits[parent]
+        patterns = (pool.pattern_weight[parent], pool.equal_pairs[parent])
+        score_p1 = pool.score_player1[parent]
+        score_p2 = pool.score_player2[parent]
+
         children = []
-        seen = set()
-        for i in range(len(parent_node.sequence) - 1):
-            child = self._create_child(parent_node, i, depth)
-            child_key = (child.sequence, child.score_player1, child.score_player2)
-            if child_key not in seen:
-                seen.add(child_key)
-                children.append(child)
+        for move, new_bits, score_change in GameTree._generate_moves(bits, length):
+            if is_player1:
+                new_score_p1, new_score_p2 = score_p1 + score_change, score_p2
+            else:
+                new_score_p1, new_score_p2 = score_p1, score_p2 + score_change
+            stored_bits = min(new_bits, new_bits ^ mask)
+            key = (stored_bits << 16) | ((new_score_p1 & 0xFF) << 8) | (new_score_p2 & 0xFF)
+            child = layer_dict.get(key)
+            if child is None:
+                child = pool.add(stored_bits, length - 1, new_score_p1, new_score_p2,
+                                 GameTree._update_patterns(bits, length, move, patterns))
+                layer_dict[key] = child
+            edge = (child << 1) | (stored_bits != new_bits)
+            if edge in children:
+                continue
+            children.append(edge)
+        pool.set_children(parent, children)
         return children
 
+    def _pack_key(self, node: int) -> int:
+        """Packs (bits, score_p1, score_p2) of a pool node into one integer, unique within a layer."""
+        pool = self.pool
+        bits = pool.bits[node]
+        if self.canonicalize:
+            bits = min(bits, bits ^ ((1 << pool.length[node]) - 1))
+        return (bits << 16) | ((pool.score_player1[node] & 0xFF) << 8) | (pool.score_player2[node] & 0xFF)
+
+    @staticmethod
+    def _find_child(parent_node: GameState, first_digit_to_join: int):
+        """Returns the child of 'parent_node' reached by merging the pair at 'first_digit_to_join', or None."""
+        new_bits, score_change = GameTree._merge_pair(parent_node.bits, parent_node.length, first_digit_to_join)
+        parent_total = parent_node.score_player1 + parent_node.score_player2
+        for child in parent_node.children:
+            if (child.bits == new_bits
+                    and child.score_player1 + child.score_player2 - parent_total == score_change):
+                return child
+        return None
+
+    @staticmethod
+    def _get_child_moves(parent_node: GameState, children: list = None) -> list:
+        """Pairs each child of 'parent_node' with the first move (pair index) that produces it."""
+        if children is None:
+            children = parent_node.children
+        first_moves = {}
+        for move, new_bits, score_change in GameTree._generate_moves(parent_node.bits, parent_node.length):
+            first_moves.setdefault((new_bits, score_change), move)
+        parent_total = parent_node.score_player1 + parent_node.score_player2
+        return [(first_moves[(child.bits, child.score_player1 + child.score_player2 - parent_total)], child)
+                for child in children]
+
+    @staticmethod
+    def _merge_pair(bits: int, length: int, first_digit_to_join: int) -> tuple:
+        """
+        Merges the pair (a, b) at 'first_digit_to_join' of an encoded sequence.
+        The pair always becomes NOT b and scores +1 if a == b, otherwise -1.
+        Returns (new_bits, score_change).
+        """
+        low = length - 2 - first_digit_to_join  # bit position of b
+        low_mask = (1 << (low + 1)) - 1
+        new_bits = ((bits >> (low + 2)) << (low + 1)) | ((bits & low_mask) ^ (1 << low))
+        score_change = 1 if ((bits ^ (bits >> 1)) >> low) & 1 == 0 else -1
+        return new_bits, score_change
+
+    @staticmethod
+    def _generate_moves(bits: int, length: int) -> list:
+        """
+        Generates every move of an encoded sequence in merge index order.
+        Returns a list of (first_digit_to_join, new_bits, score_change) tuples.
+        """
+        moves = []
+        # Bit j of 'differs' is set when the pair ending at bit position j holds different digits
+        differs = bits ^ (bits >> 1)
+        for low in range(length - 2, -1, -1):
+            new_bits = ((bits >> (low + 2)) << (low + 1)) | ((bits & ((1 << (low + 1)) - 1)) ^ (1 << low))
+            moves.append((length - 2 - low, new_bits, -1 if (differs >> low) & 1 else 1))
+        return moves
+
+    _pattern_weights = (0, 1, -1, 1, 1, -1, 1, 0)
+    """Heuristic weight of each 3-digit window, indexed by its value: 001, 011, 100, 110 count +1, 010 and 101 -1."""
+    _pattern_deltas: list
+    """Lookup table of _update_patterns, built by _get_pattern_deltas when the module is loaded."""
+    _pattern_delta_arrays = None
+    """_pattern_deltas split into NumPy columns for the vectorized builder."""
+
+    @staticmethod
+    def _count_patterns(bits: int, length: int) -> tuple:
+        """Counts (pattern_weight, equal_pairs) of an encoded sequence from scratch."""
+        weights = GameTree._pattern_weights
+        pattern_weight = 0
+        for low in range(length - 2):
+            pattern_weight += weights[(bits >> low) & 7]
+        differs = (bits ^ (bits >> 1)) & ((1 << (length - 1)) - 1) if length > 1 else 0
+        return pattern_weight, max(length - 1, 0) - bin(differs).count("1")
+
+    @staticmethod
+    def _update_patterns(bits: int, length: int, first_digit_to_join: int, patterns: tuple) -> tuple:
+        """
+        Derives (pattern_weight, equal_pairs) of the sequence produced by a move from the counts of the parent.
+        Only windows and pairs within two digits of the merged pair change, so the change is looked up
+        in _pattern_deltas by the (up to 6-digit) segment around the pair.
+        """
+        left = min(first_digit_to_join, 2)
+        right = min(length - 2 - first_digit_to_join, 2)
+        segment = (bits >> (length - 2 - first_digit_to_join - right)) & ((1 << (left + 2 + right)) - 1)
+        delta_weight, delta_pairs = GameTree._pattern_deltas[(left * 3 + right) << 6 | segment]
+        return patterns[0] + delta_weight, patterns[1] + delta_pairs
+
+    @staticmethod
+    def _get_pattern_deltas() -> list:
+        """
+        Builds the lookup table of _update_patterns: the change of both counts for every segment of 'left' digits,
+        the merged pair and 'right' digits, indexed by ((left * 3 + right) << 6) | segment.
+        """
+        deltas = [None] * (9 << 6)
+        for left in range(3):
+            for right in range(3):
+                length = left + 2 + right
+                for segment in range(1 << length):
+                    new_bits, _ = GameTree._merge_pair(segment, length, left)
+                    weight, pairs = GameTree._count_patterns(segment, length)
+                    new_weight, new_pairs = GameTree._count_patterns(new_bits, length - 1)
+                    deltas[(left * 3 + right) << 6 | segment] = (new_weight - weight, new_pairs - pairs)
+        return deltas
+
     @staticmethod
     def _generate_random_sequence(length: int) -> str:
         """Generate a random string of '0's and '1's."""
@@ -258,9 +1023,9 @@ class GameTree:
 
         def traverse(n: GameState):
             nonlocal node_count, size_in_bytes
-            if id(n) in visited:
+            if n.index in visited:
                 return
-            visited.add(id(n))
+            visited.add(n.index)
 
             node_count += 1
             size_in_bytes += GameState.get_size(n)
@@ -287,14 +1052,14 @@ class GameTree:
         """
         Prints total and unique node counts at each level.
         Total states is the sum of frequencies (i.e. count of duplicate references),
-        while unique states is the number of distinct nodes (by identity).
+        while unique states is the number of distinct nodes (by pool index).
         """
         if not game_tree_root:
             print("Tree is empty.")
             return
 
         level_dict = {}
-        level_dict[0] = { id(game_tree_root): (game_tree_root, 1) }
+        level_dict[0] = { game_tree_root.index: (game_tree_root, 1) }
         current_level = 0
 
         # Build level-by-level counts until no children are found
@@ -304,7 +1069,7 @@ class GameTree:
             for node_id, (node, freq) in level_dict[current_level].items():
                 # Expand children (each node is expanded only once)
                 for child in node.children:
-                    child_id = id(child)
+                    child_id = child.index
                     # Increase frequency if already seen at next level
                     if child_id in next_level:
                         existing_node, existing_freq = next_level[child_id]
@@ -364,3 +1129,6 @@ class GameTree:
         for node in level_nodes:
             sequence_str = node.sequence  
             print(f"| {sequence_str:<16} | {node.score_player1:<8} | {node.score_player2:<8} |")
+
+
+GameTree._pattern_deltas = GameTree._get_pattern_deltas()
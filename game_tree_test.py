@@ -1,8 +1,12 @@
 # This file is for testing/examples of game_tree.py
 import random
+import threading
 import time
 
-from game_tree import GameTree
+from array import array
+
+import game_tree
+from game_tree import GameState, GameTree
 
 # ------------------------------------------------------------------------------------------------------------
 # Usage example for printing full tree structure and stats
@@ -34,7 +38,7 @@ def test_2_how_big_tree_can_be_generated():
     depth_limit = sequence_length = 16
     print(f"\n\n\033[92m## Generating GameTree({sequence_length})\033[0m")
     start_time = time.time()
-    game = GameTree(sequence_length, depth_limit)
+    game = GameTree(sequence_length, depth_limit, vectorized=game_tree.np is not None)
     time_elapsed = time.time() - start_time
     print(f"generation took {time_elapsed:.6f} seconds, it`s size:")
     GameTree.print_stats(game.root)
@@ -96,7 +100,249 @@ def test_3_traverse_by_positive_moves(sequence, depth_limit=5):
     print("\nGame ended. Final tree structure from root:")
     GameTree.print_tree(game.root)
 
+
+# ------------------------------------------------------------------------------------------------------------
+# Checks that the integer encoded move generator follows the string rules for every sequence up to max_length
+# ------------------------------------------------------------------------------------------------------------
+def test_4_bit_moves_match_string_rules(max_length=10):
+    print("# Test 4: Integer move generator vs string rules")
+    rules = {"00": ("1", +1), "01": ("0", -1), "10": ("1", -1), "11": ("0", +1)}
+    failed = 0
+    for length in range(1, max_length + 1):
+        for value in range(2 ** length):
+            sequence = format(value, f"0{length}b")
+            bits, _ = GameState.encode_sequence(sequence)
+            expected = []
+            for i in range(length - 1):
+                new_digit, score_change = rules[sequence[i:i + 2]]
+                expected.append((i, sequence[:i] + new_digit + sequence[i + 2:], score_change))
+            actual = [(i, GameState.decode_sequence(new_bits, length - 1), score_change)
+                      for i, new_bits, score_change in GameTree._generate_moves(bits, length)]
+            if actual != expected:
+                failed += 1
+                print(f"\033[91m {sequence}: expected {expected}, got {actual} \033[0m")
+    if not failed:
+        print(f"\033[92m All sequences up to length {max_length} - Passed \033[0m")
+    assert failed == 0
+
+
+# ------------------------------------------------------------------------------------------------------------
+# After every random move the tree extended from the stored frontier must hold exactly the nodes a fresh
+# build from the current state would hold
+# ------------------------------------------------------------------------------------------------------------
+def test_5_incremental_frontier(games=20, seed=2):
+    print("# Test 5: Incremental frontier extension")
+    rng = random.Random(seed)
+    failed = 0
+    for _ in range(games):
+        sequence = "".join(rng.choice("01") for _ in range(rng.randint(5, 14)))
+        game = GameTree(sequence, rng.random() < 0.5, rng.randint(1, 6))
+        while game.current_state.children:
+            game.move_to_next_state_by_child(rng.choice(game.current_state.children))
+            created, eager = game.get_lazy_stats()
+            if created != eager:
+                failed += 1
+                print(f"\033[91m {sequence}, move {game.current_depth}: {created} nodes, fresh build {eager} \033[0m")
+    if not failed:
+        print(f"\033[92m {games} games - Passed \033[0m")
+    assert failed == 0
+
+
+# ------------------------------------------------------------------------------------------------------------
+# Pattern counts derived from the parent during child creation must equal a full recount of the sequence,
+# in eager, lazy and compacted trees
+# ------------------------------------------------------------------------------------------------------------
+def test_6_incremental_patterns(games=10, seed=6):
+    print("# Test 6: Incremental pattern counts")
+    rng = random.Random(seed)
+    failed = 0
+    for _ in range(games):
+        sequence = "".join(rng.choice("01") for _ in range(rng.randint(5, 16)))
+        game = GameTree(sequence, True, 4, lazy=rng.random() < 0.5)
+        while game.current_state.children:
+            game.move_to_next_state_by_child(rng.choice(game.current_state.children))
+            pool = game.pool
+            for node in range(len(pool)):
+                expected = GameTree._count_patterns(pool.bits[node], pool.length[node])
+                if (pool.pattern_weight[node], pool.equal_pairs[node]) != expected:
+                    failed += 1
+                    print(f"\033[91m {GameState._view(pool, node)}: {pool.pattern_weight[node]}, "
+                          f"{pool.equal_pairs[node]}, recount {expected} \033[0m")
+    if not failed:
+        print(f"\033[92m {games} games - Passed \033[0m")
+    assert failed == 0
+
+
+# ------------------------------------------------------------------------------------------------------------
+# The vectorized builder must produce the same pool as the per-node builder, node for node and edge for edge,
+# also when the tree is extended after moves
+# ------------------------------------------------------------------------------------------------------------
+def test_7_vectorized_builder(games=20, seed=7):
+    print("# Test 7: Vectorized tree builder")
+    if game_tree.np is None:
+        print("\033[93m NumPy is not installed - Skipped \033[0m")
+        return
+    columns = ("bits", "length", "score_player1", "score_player2", "pattern_weight", "equal_pairs",
+               "child_offset", "child_count", "child_index")
+    rng = random.Random(seed)
+    failed = 0
+    for _ in range(games):
+        sequence = "".join(rng.choice("01") for _ in range(rng.randint(2, 16)))
+        options = (rng.random() < 0.5, rng.randint(1, 6), rng.random() < 0.7)
+        game = GameTree(sequence, *options)
+        vectorized_game = GameTree(sequence, *options, vectorized=True)
+        while True:
+            differing = [column for column in columns
+                         if getattr(game.pool, column) != getattr(vectorized_game.pool, column)]
+            if differing:
+                failed += 1
+                print(f"\033[91m {sequence}, move {game.current_depth}: {', '.join(differing)} differ \033[0m")
+                break
+            if not game.current_state.children:
+                break
+            child = rng.randrange(len(game.current_state.children))
+            game.move_to_next_state_by_child(game.current_state.children[child])
+            vectorized_game.move_to_next_state_by_child(vectorized_game.current_state.children[child])
+    if not failed:
+        print(f"\033[92m {games} games - Passed \033[0m")
+    assert failed == 0
+
+
+
+# ------------------------------------------------------------------------------------------------------------
+# Trees built with worker processes must have the same nodes and edges as trees built in one process.
+# Node numbers differ, so both trees are walked from the current state side by side
+# ------------------------------------------------------------------------------------------------------------
+def test_8_sharded_builder(games=10, seed=8, worker_counts=(2, 3, 4), layer_size=16):
+    print("# Test 8: Sharded tree builder")
+    columns = ("bits", "length", "score_player1", "score_player2", "pattern_weight", "equal_pairs")
+
+    def same_trees(game, sharded_game):
+        pool, sharded_pool = game.pool, sharded_game.pool
+        mapping = {game.current_state.index: sharded_game.current_state.index}
+        pending = list(mapping.items())
+        while pending:
+            node, sharded_node = pending.pop()
+            if any(getattr(pool, column)[node] != getattr(sharded_pool, column)[sharded_node] for column in columns):
+                return False
+            edges, sharded_edges = pool.get_children(node), sharded_pool.get_children(sharded_node)
+            if len(edges) != len(sharded_edges):
+                return False
+            for edge, sharded_edge in zip(edges, sharded_edges):
+                if edge & 1 != sharded_edge & 1:
+                    return False
+                if edge >> 1 not in mapping:
+                    mapping[edge >> 1] = sharded_edge >> 1
+                    pending.append((edge >> 1, sharded_edge >> 1))
+                elif mapping[edge >> 1] != sharded_edge >> 1:
+                    return False
+        return len(set(mapping.values())) == len(mapping)
+
+    parallel_layer_size = GameTree.parallel_layer_size
+    GameTree.parallel_layer_size = layer_size
+    rng = random.Random(seed)
+    failed = 0
+    try:
+        for game_index in range(games):
+            workers = worker_counts[game_index % len(worker_counts)]
+            sequence = "".join(rng.choice("01") for _ in range(rng.randint(2, 14)))
+            options = (rng.random() < 0.5, rng.randint(1, 6), rng.random() < 0.7)
+            game = GameTree(sequence, *options)
+            sharded_game = GameTree(sequence, *options, workers=workers)
+            while True:
+                if not same_trees(game, sharded_game):
+                    failed += 1
+                    print(f"\033[91m {sequence}, move {game.current_depth}: trees differ \033[0m")
+                    break
+                if not game.current_state.children:
+                    break
+                child = rng.randrange(len(game.current_state.children))
+                game.move_to_next_state_by_child(game.current_state.children[child])
+                sharded_game.move_to_next_state_by_child(sharded_game.current_state.children[child])
+            sharded_game.close()
+    finally:
+        GameTree.parallel_layer_size = parallel_layer_size
+
+    # Every shard of a large layer gets close to its share of the nodes
+    game = GameTree("01101001110100110101", False, 6)
+    layer = [game.root.index]
+    for depth in range(6):
+        layer = array('I', {edge >> 1: None for node in layer for edge in game.pool.get_children(node)})
+        for workers in worker_counts + (8,):
+            game.workers = workers
+            sizes = [len(shard) for shard in game._split_layer(layer)]
+            if len(layer) >= 1000 and min(sizes) < 0.8 * len(layer) / workers:
+                failed += 1
+                print(f"\033[91m Layer {depth + 1}, {workers} workers: unbalanced shards {sizes} \033[0m")
+    if not failed:
+        print(f"\033[92m {games} games - Passed \033[0m")
+    assert failed == 0
+
+
+# ------------------------------------------------------------------------------------------------------------
+# With a node, memory or time budget the chosen depth limit must build the same tree as that fixed depth limit,
+# and no move may grow the tree past a node or memory budget
+# ------------------------------------------------------------------------------------------------------------
+def test_9_build_budget(games=10, seed=9, node_budget=20_000, memory_budget=500_000):
+    print("# Test 9: Budgeted depth limit")
+    rng = random.Random(seed)
+    failed = 0
+    for _ in range(games):
+        sequence = "".join(rng.choice("01") for _ in range(rng.randint(8, 20)))
+        for budget in ({"node_budget": node_budget}, {"memory_budget": memory_budget}, {"time_budget": 0.05}):
+            game = GameTree(sequence, True, 5, vectorized=rng.random() < 0.5 and game_tree.np is not None, **budget)
+            # The depth limit chosen for the budget builds the same tree as a fixed one
+            fixed_game = GameTree(sequence, False, game.depth_limit)
+            if len(game.pool) != len(fixed_game.pool):
+                failed += 1
+                print(f"\033[91m {sequence}, {budget}: {len(game.pool)} nodes, fixed depth limit "
+                      f"{game.depth_limit} builds {len(fixed_game.pool)} \033[0m")
+            while game.current_state.children:
+                if (len(game.pool) > budget.get("node_budget", len(game.pool))
+                        or game.pool.get_size() > budget.get("memory_budget", game.pool.get_size())):
+                    failed += 1
+                    print(f"\033[91m {sequence}, {budget}, move {game.current_depth}: budget exceeded \033[0m")
+                    break
+                game.move_to_next_state_by_child(rng.choice(game.current_state.children))
+    if not failed:
+        print(f"\033[92m {games} games - Passed \033[0m")
+    assert failed == 0
+
+
+# ------------------------------------------------------------------------------------------------------------
+# A build cancelled from another thread must stop with BuildCancelled soon after the event is set, with both
+# the per-node and the vectorized builder
+# ------------------------------------------------------------------------------------------------------------
+def test_10_cancel_build(sequence="0110100111010011010110", depth_limit=8):
+    print("# Test 10: Cancelled tree build")
+    failed = 0
+    for vectorized in (False, game_tree.np is not None):
+        cancel_event = threading.Event()
+        timer = threading.Timer(0.05, cancel_event.set)
+        timer.start()
+        start_time = time.time()
+        try:
+            GameTree(sequence, False, depth_limit, vectorized=vectorized, cancel_event=cancel_event)
+            cancelled = False
+        except game_tree.BuildCancelled:
+            cancelled = True
+        elapsed = time.time() - start_time
+        timer.join()
+        if not cancelled or elapsed > 2:
+            failed += 1
+            print(f"\033[91m vectorized {vectorized}: cancelled {cancelled} after {elapsed:.2f} seconds \033[0m")
+    if not failed:
+        print(f"\033[92m Cancelled builds - Passed \033[0m")
+    assert failed == 0
+
     
 test_1_print_full_tree()        
 #test_2_how_big_tree_can_be_generated()
-test_3_traverse_by_positive_moves(10, 5)
\ No newline at end of file
+test_3_traverse_by_positive_moves(10, 5)
+# test_4_bit_moves_match_string_rules(12)
+# test_5_incremental_frontier()
+# test_6_incremental_patterns()
+# test_7_vectorized_builder()
+# test_8_sharded_builder()
+# test_9_build_budget()
+# test_10_cancel_build()
\ No newline at end of file
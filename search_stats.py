@@ -0,0 +1,136 @@
+import io
+import pstats
+import time
+
+from contextlib import contextmanager
+
+str_blue = "\033[34m"
+str_reset = "\033[0m"
+
+
+class SearchStats:
+    """
+    Statistics of one search, collected by ComputerPlayer.get_path and kept as ComputerPlayer.stats.
+    Tell apart a large tree (nodes per depth), poor move ordering (cutoffs late in the child list, high branching
+    factor) and a thrashing transposition table (low hit rate, many stores).
+    """
+    algorithm: str
+    """Algorithm of the search."""
+    depth: int
+    """Plies from the searched state down to the leaves of its tree."""
+    completed_depth: int
+    """Deepest completed iteration of an anytime search, otherwise equal to 'depth'."""
+    nodes_per_depth: list
+    """Nodes visited at each ply below the searched state, the state itself being ply 0."""
+    table_hits: int
+    """Transposition table lookups that found an entry."""
+    table_misses: int
+    """Transposition table lookups that found nothing."""
+    table_stores: int
+    """Entries written to the transposition table."""
+    cutoffs: int
+    """Alpha-beta cutoffs."""
+    cutoff_child_index: list
+    """Number of cutoffs caused by the first, second, ... searched child. Good move ordering cuts at the first."""
+    leaf_evaluations: int
+    """Calls of the evaluation function, counting every node of a batch."""
+    phase_seconds: dict
+    """Wall time per phase: "total" for the whole call, parts such as "path" or "tablebase" are included in it."""
+    profile: object
+    """cProfile.Profile of the search if the player profiles, otherwise None."""
+    pondered: bool
+    """The search was answered from a result found while pondering (see ComputerPlayer.ponder)."""
+
+    def __init__(self, algorithm: str = None, depth: int = 0):
+        self.algorithm = algorithm
+        self.depth = depth
+        self.completed_depth = depth
+        self.nodes_per_depth = []
+        self.table_hits = 0
+        self.table_misses = 0
+        self.table_stores = 0
+        self.cutoffs = 0
+        self.cutoff_child_index = []
+        self.leaf_evaluations = 0
+        self.phase_seconds = {}
+        self.profile = None
+        self.pondered = False
+
+    @property
+    def nodes(self) -> int:
+        """Nodes visited at all depths."""
+        return sum(self.nodes_per_depth)
+
+    @property
+    def effective_branching_factor(self) -> float:
+        """Branching factor of a uniform tree of the searched depth with as many nodes: nodes ** (1 / depth)."""
+        depth = max(self.completed_depth, 1)
+        return self.nodes ** (1 / depth) if self.nodes else 0.0
+
+    def record_nodes(self, ply: int, count: int = 1):
+        SearchStats._add(self.nodes_per_depth, ply, count)
+
+    def record_cutoff(self, child_index: int):
+        self.cutoffs += 1
+        SearchStats._add(self.cutoff_child_index, child_index, 1)
+
+    @staticmethod
+    def _add(counts: list, index: int, count: int):
+        """Adds 'count' to counts[index], growing the list as needed."""
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += count
+
+    @contextmanager
+    def timer(self, phase: str):
+        """Adds the wall time of the block to 'phase'."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + time.perf_counter() - start_time
+
+    def merge(self, other: "SearchStats", ply_offset: int = 0):
+        """Adds the counters of 'other', a search of a state 'ply_offset' plies below the state of this one."""
+        for ply, count in enumerate(other.nodes_per_depth):
+            SearchStats._add(self.nodes_per_depth, ply + ply_offset, count)
+        for child_index, count in enumerate(other.cutoff_child_index):
+            SearchStats._add(self.cutoff_child_index, child_index, count)
+        self.cutoffs += other.cutoffs
+        self.table_hits += other.table_hits
+        self.table_misses += other.table_misses
+        self.table_stores += other.table_stores
+        self.leaf_evaluations += other.leaf_evaluations
+
+    def get_stats(self) -> dict:
+        lookups = self.table_hits + self.table_misses
+        return {"algorithm": self.algorithm, "depth": self.depth, "completed_depth": self.completed_depth,
+                "nodes": self.nodes, "nodes_per_depth": list(self.nodes_per_depth),
+                "effective_branching_factor": self.effective_branching_factor,
+                "table_hits": self.table_hits, "table_misses": self.table_misses, "table_stores": self.table_stores,
+                "table_hit_rate": self.table_hits / lookups if lookups else 0.0,
+                "cutoffs": self.cutoffs, "cutoff_child_index": list(self.cutoff_child_index),
+                "leaf_evaluations": self.leaf_evaluations, "phase_seconds": dict(self.phase_seconds),
+                "pondered": self.pondered}
+
+    def print_stats(self):
+        stats = self.get_stats()
+        first_child_cutoffs = self.cutoff_child_index[0] if self.cutoff_child_index else 0
+        phases = ", ".join(f"{phase} {1000 * seconds:.1f} ms" for phase, seconds in self.phase_seconds.items())
+        print(f"{str_blue}Search ({self.algorithm}, depth {self.completed_depth}/{self.depth}"
+              f"{', pondered' if self.pondered else ''}): "
+              f"{stats['nodes']} nodes, per depth {stats['nodes_per_depth']}, "
+              f"branching factor {stats['effective_branching_factor']:.2f}, {self.leaf_evaluations} evaluations\n"
+              f"  table {self.table_hits} hits, {self.table_misses} misses ({100 * stats['table_hit_rate']:.1f}% hits), "
+              f"{self.table_stores} stores; {self.cutoffs} cutoffs, {first_child_cutoffs} at the first child, "
+              f"by child {stats['cutoff_child_index']}\n"
+              f"  {phases}{str_reset}")
+
+    def print_profile(self, lines: int = 20, sort: str = "cumulative"):
+        """Prints the 'lines' most expensive functions of the profiled search."""
+        if self.profile is None:
+            print("The search was not profiled.")
+            return
+        output = io.StringIO()
+        pstats.Stats(self.profile, stream=output).sort_stats(sort).print_stats(lines)
+        print(output.getvalue())
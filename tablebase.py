@@ -0,0 +1,115 @@
+import argparse
+import mmap
+import struct
+import time
+
+from array import array
+
+from game_tree import GameTree
+
+str_blue = "\033[34m"
+str_reset = "\033[0m"
+
+default_tablebase_path = "tablebase.bin"
+
+_magic = b"PMTB"
+_header = struct.Struct("<4sBBxx")
+"""Magic, format version and max_length, padded to 8 bytes."""
+_record = struct.Struct("<bB")
+"""Value and best move of a single sequence."""
+_version = 1
+no_move = 255
+"""Best move stored for sequences of length 1."""
+
+
+def solve(max_length: int) -> tuple:
+    """
+    Solves every sequence up to 'max_length' digits by backward induction, shortest sequences first.
+    Only canonical sequences (first digit 0) are solved, the complement of a sequence has the same
+    value and best move. The sequence 'bits' of 'length' digits is stored at index (1 << (length - 1)) | bits.
+
+    The value is the exact remaining score difference (own points minus opponent points) the player to
+    move can force, the best move is the first pair index reaching it.
+    Returns (values, moves) arrays.
+    """
+    if not 1 <= max_length < 32:
+        raise ValueError("Tablebase length must be between 1 and 31.")
+    size = 1 << max_length
+    values = array('b', bytes(size))
+    moves = array('B', [no_move]) * size
+
+    for length in range(2, max_length + 1):
+        base = 1 << (length - 1)
+        child_base = 1 << (length - 2)
+        child_mask = (1 << (length - 1)) - 1
+        for bits in range(base):
+            best_value = -128
+            best_move = no_move
+            for move, child_bits, score_change in GameTree._generate_moves(bits, length):
+                if child_bits >> (length - 2):
+                    child_bits ^= child_mask
+                value = score_change - values[child_base | child_bits]
+                if value > best_value:
+                    best_value = value
+                    best_move = move
+            values[base | bits] = best_value
+            moves[base | bits] = best_move
+    return values, moves
+
+
+def write_tablebase(path: str, max_length: int):
+    """Solves all sequences up to 'max_length' digits and writes them to 'path'."""
+    values, moves = solve(max_length)
+    records = bytearray(2 * len(values))
+    records[0::2] = values.tobytes()
+    records[1::2] = moves.tobytes()
+    with open(path, "wb") as file:
+        file.write(_header.pack(_magic, _version, max_length))
+        file.write(records)
+
+
+class Tablebase:
+    """Read-only, memory-mapped view of a tablebase file written by 'write_tablebase'."""
+    max_length: int
+    """Longest sequence stored in the tablebase."""
+    path: str
+    """File the tablebase is read from."""
+
+    def __init__(self, path: str = default_tablebase_path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_length = _header.unpack_from(self._map, 0)
+        if magic != _magic or version != _version:
+            self.close()
+            raise ValueError(f"{path} is not a tablebase file.")
+        if len(self._map) != _header.size + _record.size * (1 << self.max_length):
+            self.close()
+            raise ValueError(f"{path} is truncated.")
+
+    def probe(self, bits: int, length: int):
+        """
+        Looks up an encoded sequence in O(1).
+        Returns (value, best_move) for the player to move, or None if the sequence is not in the tablebase.
+        """
+        if not 1 <= length <= self.max_length:
+            return None
+        if bits >> (length - 1):
+            bits ^= (1 << length) - 1
+        return _record.unpack_from(self._map, _header.size + _record.size * ((1 << (length - 1)) | bits))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve all sequences up to a given length and store them as a tablebase.")
+    parser.add_argument("--max-length", type=int, default=16, help="longest sequence to solve (default: 16)")
+    parser.add_argument("--output", default=default_tablebase_path, help=f"output file (default: {default_tablebase_path})")
+    args = parser.parse_args()
+
+    print(f"{str_blue}Solving sequences up to {args.max_length} digits... ", end="", flush=True)
+    timer = time.time()
+    write_tablebase(args.output, args.max_length)
+    print(f"done in {time.time() - timer:.2f} seconds, written to {args.output}{str_reset}")
@@ -0,0 +1,255 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import math
+import os
+import random
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from computer_player import ComputerPlayer
+from game_tree import GameTree
+from tablebase import Tablebase, default_tablebase_path
+
+str_blue = "\033[34m"
+str_red = "\033[31m"
+str_green = "\033[32m"
+str_reset = "\033[0m"
+
+default_engines = ("alpha_beta", "heuristic")
+
+_tablebases = {}
+"""Tablebases opened by this process by their path, shared by all players of its games."""
+
+
+def parse_engine(spec: str) -> tuple:
+    """
+    Parses an engine given as "algorithm[:depth[:time_limit]]", e.g. "pvs", "alpha_beta:6" or "mtdf:auto:0.5".
+    The depth is the depth limit of the engine's game tree, "auto" (the default) chooses it from the sequence length.
+    Returns (algorithm, depth_limit, time_limit), with None for the defaults.
+    """
+    parts = spec.split(":")
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"Invalid engine {spec}. Use algorithm[:depth[:time_limit]].")
+    algorithm = parts[0]
+    depth_limit = int(parts[1]) if len(parts) > 1 and parts[1] != "auto" else None
+    time_limit = float(parts[2]) if len(parts) > 2 else None
+    # Rejects unknown algorithms before any game is played
+    ComputerPlayer(algorithm, table_size=1)
+    return algorithm, depth_limit, time_limit
+
+
+def format_engine(engine: tuple) -> str:
+    """Returns the name of an engine, the inverse of parse_engine."""
+    algorithm, depth_limit, time_limit = engine
+    name = algorithm
+    if depth_limit is not None or time_limit is not None:
+        name += f":{depth_limit if depth_limit is not None else 'auto'}"
+    if time_limit is not None:
+        name += f":{time_limit:g}"
+    return name
+
+
+def get_start_sequence(seed: int, index: int, min_length: int = 15, max_length: int = 25) -> str:
+    """Returns the start sequence of game 'index', seeded from 'seed' and the index only."""
+    rng = random.Random(seed * 1_000_003 + index)
+    return "".join(rng.choice("01") for _ in range(rng.randint(min_length, max_length)))
+
+
+def play_game(task: tuple) -> dict:
+    """
+    Plays one game between two engines from 'sequence' and returns its record. Every engine keeps a game tree
+    of its own with its depth setting, both trees follow the moves played, and a new player, so results do not
+    depend on which process played which games before. Only get_path is timed, not the tree updates.
+    """
+    sequence, engines, tablebase_path = task
+    tablebase = None
+    if tablebase_path is not None:
+        tablebase = _tablebases.get(tablebase_path)
+        if tablebase is None:
+            tablebase = _tablebases[tablebase_path] = Tablebase(tablebase_path)
+    tablebase_length = tablebase.max_length if tablebase is not None else 0
+    trees = []
+    players = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for algorithm, depth_limit, time_limit in engines:
+            # Pruning searches only expand what they visit
+            lazy = algorithm not in ("minimax", "backward_induction", "heuristic")
+            trees.append(GameTree(sequence, depth_limit is None, depth_limit or 5, tablebase_length=tablebase_length,
+                                  lazy=lazy))
+            players.append(ComputerPlayer(algorithm, tablebase=tablebase, time_limit=time_limit))
+
+        moves = []
+        while trees[0].current_state.children:
+            mover = trees[0].get_current_player() - 1
+            state = trees[mover].current_state
+            player = players[mover]
+            nodes_visited = player.nodes_visited
+            start_time = time.perf_counter()
+            path, _ = player.get_path(state, mover == 0)
+            seconds = time.perf_counter() - start_time
+            move = ComputerPlayer._get_path_moves(path[:2])[0]
+            moves.append((mover, seconds, player.nodes_visited - nodes_visited))
+            for tree in trees:
+                tree.move_to_next_state_by_move(move)
+    final_state = trees[0].current_state
+    score_player1, score_player2 = final_state.score_player1, final_state.score_player2
+    return {"sequence": sequence, "engines": [format_engine(engine) for engine in engines],
+            "score": [score_player1, score_player2],
+            "winner": 1 if score_player1 > score_player2 else 2 if score_player2 > score_player1 else 0,
+            "moves": moves}
+
+
+def get_tasks(engines: list, games: int, seed: int = 25, min_length: int = 15, max_length: int = 25,
+              tablebase_path: str = None) -> list:
+    """
+    Returns the games of a round robin between 'engines', or of an engine against itself if only one is given.
+    Every pairing plays 'games' start sequences, each twice with the players swapped, so neither engine profits
+    from a start that favours the first or the second player.
+    """
+    pairings = list(itertools.combinations(engines, 2)) or [(engines[0], engines[0])]
+    tasks = []
+    for first, second in pairings:
+        for index in range(games):
+            sequence = get_start_sequence(seed, index, min_length, max_length)
+            tasks.append((sequence, (first, second), tablebase_path))
+            tasks.append((sequence, (second, first), tablebase_path))
+    return tasks
+
+
+def run_tournament(engines: list, games: int = 50, seed: int = 25, min_length: int = 15, max_length: int = 25,
+                   workers: int = 1, tablebase_path: str = None, progress: bool = False) -> dict:
+    """
+    Plays all games of get_tasks with 'workers' processes, or in this process with 1.
+    Returns the settings, the records of all games in task order and their summary (see summarize).
+    """
+    tasks = get_tasks(engines, games, seed, min_length, max_length, tablebase_path)
+    records = []
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        results = (executor.map(play_game, tasks, chunksize=max(1, len(tasks) // (8 * workers)))
+                   if executor is not None else map(play_game, tasks))
+        start_time = time.perf_counter()
+        for record in results:
+            records.append(record)
+            if progress:
+                print(f"\r{len(records)}/{len(tasks)} games, {time.perf_counter() - start_time:.1f} seconds",
+                      end="", flush=True)
+        if progress:
+            print()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return {"engines": [format_engine(engine) for engine in engines], "games": games, "seed": seed,
+            "lengths": [min_length, max_length], "workers": workers, "tablebase": tablebase_path,
+            "records": records, "summary": summarize(records)}
+
+
+def _percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of sorted 'values'."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(records: list) -> dict:
+    """
+    Summarizes game records. "pairings" holds the wins, draws and losses of the first engine of every pairing
+    ("A vs B", names sorted) with their rates, for an engine against itself those of player 1.
+    "engines" holds for every engine its games, points (1 per win, 0.5 per draw), mean margin (own score minus the
+    opponent's), per-move latency percentiles in milliseconds and nodes per move. Many starts are won by the same
+    player whoever plays them, the margin still shows the points an engine gave away.
+    """
+    pairings = {}
+    engines = {}
+    for record in records:
+        names = record["engines"]
+        first, second = sorted(names)
+        pairing = pairings.setdefault(f"{first} vs {second}", {"games": 0, "wins": 0, "draws": 0, "losses": 0})
+        pairing["games"] += 1
+        if record["winner"] == 0:
+            pairing["draws"] += 1
+        elif names[record["winner"] - 1] == first and (first != second or record["winner"] == 1):
+            pairing["wins"] += 1
+        else:
+            pairing["losses"] += 1
+        for player, name in enumerate(names):
+            engine = engines.setdefault(name, {"games": 0, "points": 0.0, "margin": 0, "seconds": [], "nodes": []})
+            engine["games"] += 1
+            engine["points"] += 0.5 if record["winner"] == 0 else float(record["winner"] == player + 1)
+            engine["margin"] += record["score"][player] - record["score"][1 - player]
+        for mover, seconds, nodes in record["moves"]:
+            engines[names[mover]]["seconds"].append(seconds)
+            engines[names[mover]]["nodes"].append(nodes)
+
+    for pairing in pairings.values():
+        pairing["win_rate"] = pairing["wins"] / pairing["games"]
+        pairing["draw_rate"] = pairing["draws"] / pairing["games"]
+    summary = {}
+    for name, engine in engines.items():
+        seconds = sorted(engine["seconds"])
+        moves = len(seconds)
+        summary[name] = {"games": engine["games"], "points": engine["points"],
+                         "score_rate": engine["points"] / engine["games"],
+                         "margin": engine["margin"] / engine["games"], "moves": moves,
+                         "latency_ms": {label: 1000 * _percentile(seconds, fraction) if moves else 0.0
+                                        for label, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99),
+                                                                ("max", 1.0))},
+                         "nodes_per_move": sum(engine["nodes"]) / moves if moves else 0.0}
+    return {"pairings": pairings, "engines": summary}
+
+
+def print_summary(summary: dict):
+    """Prints the result of every pairing and the score, margin, latency and node counts of every engine."""
+    for name, pairing in summary["pairings"].items():
+        print(f"{name:<40} {pairing['games']:>6} games  {pairing['wins']:>5} wins {pairing['draws']:>5} draws "
+              f"{pairing['losses']:>5} losses  ({100 * pairing['win_rate']:.1f}% wins, "
+              f"{100 * pairing['draw_rate']:.1f}% draws)")
+    print()
+    print(f"{'engine':<24} {'games':>6} {'score':>7} {'margin':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'nodes/move':>12}")
+    for name, engine in sorted(summary["engines"].items(), key=lambda item: -item[1]["score_rate"]):
+        latency = engine["latency_ms"]
+        print(f"{name:<24} {engine['games']:>6} {100 * engine['score_rate']:>6.1f}% {engine['margin']:>+7.2f} "
+              f"{latency['p50']:>9.2f} "
+              f"{latency['p90']:>9.2f} {latency['p99']:>9.2f} {latency['max']:>9.2f} "
+              f"{engine['nodes_per_move']:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine games on seeded random starts.")
+    parser.add_argument("--engines", nargs="+", default=list(default_engines),
+                        help="engines as algorithm[:depth[:time_limit]], depth 'auto' chooses it from the length "
+                             f"(default: {' '.join(default_engines)})")
+    parser.add_argument("--games", type=int, default=50,
+                        help="start sequences per pairing, each played twice with the players swapped (default: 50)")
+    parser.add_argument("--seed", type=int, default=25, help="seed of the start sequences (default: 25)")
+    parser.add_argument("--min-length", type=int, default=15, help="shortest start sequence (default: 15)")
+    parser.add_argument("--max-length", type=int, default=25, help="longest start sequence (default: 25)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes playing games (default: the number of CPUs)")
+    parser.add_argument("--tablebase", default=None,
+                        help=f"tablebase file for all engines (default: {default_tablebase_path} if it exists)")
+    parser.add_argument("--output", help="write the settings, game records and summary as JSON to this file")
+    args = parser.parse_args()
+
+    if not 2 <= args.min_length <= args.max_length:
+        parser.error("Lengths must satisfy 2 <= min-length <= max-length.")
+    try:
+        engines = [parse_engine(spec) for spec in args.engines]
+    except ValueError as error:
+        parser.error(str(error))
+    tablebase_path = args.tablebase
+    if tablebase_path is None and os.path.exists(default_tablebase_path):
+        tablebase_path = default_tablebase_path
+
+    print(f"{str_blue}Playing {', '.join(format_engine(engine) for engine in engines)} on {args.workers} "
+          f"processes...{str_reset}")
+    results = run_tournament(engines, args.games, args.seed, args.min_length, args.max_length, args.workers,
+                             tablebase_path, progress=True)
+    print_summary(results["summary"])
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"{str_blue}Results written to {args.output}{str_reset}")
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+str_blue = "\033[34m"
+str_reset = "\033[0m"
+
+exact = 0
+"""Bound of an entry whose value is the exact search value."""
+lower_bound = 1
+"""Bound of an entry from a search that failed high, the exact value is at least the stored value."""
+upper_bound = 2
+"""Bound of an entry from a search that failed low, the exact value is at most the stored value."""
+
+
+class TranspositionTable:
+    """
+    Bounded cache of search results that is kept across moves and games.
+    With the "lru" policy the least recently used entry is evicted when the table is full.
+    With the "depth" policy every key maps to one of max_size slots, and a new entry replaces the entry in its slot
+    only if it was searched at least as deep, so expensive results survive cheap ones.
+    Searches store (value, best_move, bound) entries, where bound is exact, lower_bound or upper_bound.
+    """
+    max_size: int
+    """Maximum number of stored entries."""
+    policy: str
+    """Replacement policy, "lru" or "depth"."""
+    hits: int
+    """Lookups that found an entry."""
+    misses: int
+    """Lookups that found nothing."""
+    evictions: int
+    """Entries dropped or refused to keep the table within max_size."""
+    stores: int
+    """Entries offered to the table, including those refused under the "depth" policy."""
+    policies = ("lru", "depth")
+
+    def __init__(self, max_size: int = 1_000_000, policy: str = "lru"):
+        if policy not in self.policies:
+            raise ValueError("Unsupported replacement policy. Choose lru or depth.")
+        if max_size < 1:
+            raise ValueError("Transposition table size must be positive.")
+        self.max_size = max_size
+        self.policy = policy
+        self._entries = OrderedDict() if policy == "lru" else {}
+        self.reset_counters()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+
+    def clear(self):
+        self._entries.clear()
+        self.reset_counters()
+
+    def _get_slot(self, key: int) -> int:
+        """Slot of a key under the "depth" policy. Keys are packed bit fields, so they are mixed first."""
+        return ((key * 0x9E3779B97F4A7C15) >> 32) % self.max_size
+
+    def get(self, key: int):
+        """Returns the entry stored for 'key', or None."""
+        if self.policy == "lru":
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        else:
+            slot = self._entries.get(self._get_slot(key))
+            entry = slot[2] if slot is not None and slot[0] == key else None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def peek(self, key: int):
+        """Returns the entry stored for 'key', or None, without counting the lookup or refreshing the entry."""
+        if self.policy == "lru":
+            return self._entries.get(key)
+        slot = self._entries.get(self._get_slot(key))
+        return slot[2] if slot is not None and slot[0] == key else None
+
+    def store(self, key: int, depth: int, entry):
+        """Stores 'entry' for 'key', a result searched 'depth' plies deep."""
+        entries = self._entries
+        self.stores += 1
+        if self.policy == "lru":
+            entries[key] = entry
+            entries.move_to_end(key)
+            if len(entries) > self.max_size:
+                entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            slot_index = self._get_slot(key)
+            slot = entries.get(slot_index)
+            if slot is not None and slot[0] != key:
+                self.evictions += 1
+                if slot[1] > depth:
+                    return
+            entries[slot_index] = (key, depth, entry)
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "stores": self.stores, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def print_stats(self):
+        stats = self.get_stats()
+        print(f"{str_blue}Transposition table ({self.policy}): {stats['entries']}/{self.max_size} entries, "
+              f"{stats['hits']} hits, {stats['misses']} misses ({100 * stats['hit_rate']:.1f}% hits), "
+              f"{stats['evictions']} evictions{str_reset}")